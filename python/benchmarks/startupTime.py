@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Measures the startup time of runYourProgram.py with `python3 -X importtime`.
+#
+# Usage: python3 benchmarks/startupTime.py [--runs N] [--top N] [-- RUNNER_ARGS ...]
+#
+# Without RUNNER_ARGS, the benchmark runs `--quiet --check-runnable` on a small file.
+# Reports the median wall clock time, the median time spent importing and the modules
+# with the highest self import time.
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+PYTHON_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+RUNNER = os.path.join(PYTHON_DIR, 'src', 'runYourProgram.py')
+DEFAULT_ARGS = ['--quiet', '--check-runnable', os.path.join(PYTHON_DIR, 'test-data', 'testCheck.py')]
+
+lineRe = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+
+def parseImportTime(stderr):
+    """Returns a dict mapping module names to (self, cumulative) times in microseconds and
+    the sum of cumulative times of all top-level imports."""
+    mods = {}
+    total = 0
+    for l in stderr.splitlines():
+        m = lineRe.match(l)
+        if not m:
+            continue
+        selfUs = int(m.group(1))
+        cumUs = int(m.group(2))
+        mods[m.group(4)] = (selfUs, cumUs)
+        if len(m.group(3)) == 1:
+            total += cumUs
+    return mods, total
+
+def runOnce(args):
+    env = dict(os.environ)
+    env.setdefault('PYTHONPATH', os.path.join(PYTHON_DIR, 'site-lib'))
+    cmd = [sys.executable, '-X', 'importtime', RUNNER] + args
+    start = time.perf_counter()
+    res = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                         encoding='utf-8')
+    wall = time.perf_counter() - start
+    mods, total = parseImportTime(res.stderr)
+    return wall, total, mods
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure startup time of runYourProgram.py')
+    parser.add_argument('--runs', type=int, default=10, help='Number of runs (default: 10)')
+    parser.add_argument('--top', type=int, default=15,
+                        help='Number of modules with the highest self import time to show')
+    parser.add_argument('runnerArgs', nargs='*', help='Arguments for runYourProgram.py')
+    args = parser.parse_args()
+    runnerArgs = args.runnerArgs or DEFAULT_ARGS
+    walls = []
+    totals = []
+    selfTimes = {}
+    for _ in range(args.runs):
+        wall, total, mods = runOnce(runnerArgs)
+        walls.append(wall)
+        totals.append(total)
+        for name, (selfUs, _cumUs) in mods.items():
+            selfTimes.setdefault(name, []).append(selfUs)
+    print(f'runYourProgram.py {" ".join(runnerArgs)}')
+    print(f'runs:             {args.runs}')
+    print(f'wall clock:       {statistics.median(walls) * 1000:.1f} ms (median)')
+    print(f'import time:      {statistics.median(totals) / 1000:.1f} ms (median)')
+    print(f'modules imported: {len(selfTimes)}')
+    print()
+    print(f'Top {args.top} modules by self import time (median, ms):')
+    ranked = sorted(selfTimes.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for name, times in ranked[:args.top]:
+        print(f'  {statistics.median(times) / 1000:7.2f}  {name}')
+
+if __name__ == '__main__':
+    main()
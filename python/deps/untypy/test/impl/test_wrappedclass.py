@@ -0,0 +1,54 @@
+import types
+import unittest
+
+import untypy
+from untypy.error import UntypyTypeError
+from untypy.impl.wrappedclass import LazyWrappedMember
+
+
+def inc(x: int) -> int:
+    return x + 1
+
+
+def unused(x: int) -> int:
+    return x
+
+
+class Counter:
+    def __init__(self, start: int):
+        self.value = start
+
+    def add(self, n: int) -> int:
+        self.value += n
+        return self.value
+
+
+class TestWrappedClass(unittest.TestCase):
+
+    def test_module_members_wrapped_on_access(self):
+        mod = types.ModuleType("dummy")
+        mod.__file__ = __file__
+        mod.inc = inc
+        mod.unused = unused
+        wrapped = untypy.wrap_import(mod)
+
+        self.assertIsInstance(vars(wrapped)['inc'], LazyWrappedMember)
+        self.assertEqual(wrapped.inc(1), 2)
+        self.assertNotIsInstance(vars(wrapped)['inc'], LazyWrappedMember)
+        self.assertIsInstance(vars(wrapped)['unused'], LazyWrappedMember)
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            wrapped.inc("1")
+        self.assertEqual(cm.exception.expected, "int")
+
+    def test_class_members_wrapped_on_access(self):
+        wrapped = untypy.wrap_import(Counter)
+        self.assertIsInstance(vars(wrapped)['add'], LazyWrappedMember)
+
+        c = wrapped(1)
+        self.assertEqual(c.add(2), 3)
+        self.assertNotIsInstance(vars(wrapped)['add'], LazyWrappedMember)
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            c.add("2")
+        self.assertEqual(cm.exception.expected, "int")
@@ -0,0 +1,156 @@
+import ast
+import gc
+import os
+import sys
+import tempfile
+import unittest
+
+from untypy.error import UntypyTypeError
+from untypy.patching import InlineCheckedFunctions
+from untypy.patching.ast_transformer import UntypyAstTransformer
+
+
+class TestInlineChecks(unittest.TestCase):
+
+    def test_ast_transform(self):
+        src = """
+def foo(self, x: int, *, y: str='a') -> str:
+    \"\"\"doc\"\"\"
+    def bar() -> None:
+        return
+    if x:
+        return y
+    print(x)
+
+@decorated
+def baz(*args: int) -> int:
+    return 1
+
+def gen(x: int) -> int:
+    yield x
+
+class C:
+    def m(self, x: int) -> int:
+        def f() -> int:
+            return x
+        return f()
+        """
+        target = """
+import untypy
+
+@untypy._inline_checked
+def foo(self, x: int, *, y: str='a') -> str:
+    \"\"\"doc\"\"\"
+    x, y = untypy._check_arguments(x, y)
+
+    @untypy._inline_checked
+    def bar() -> None:
+        return untypy._check_return(None)
+    if x:
+        return untypy._check_return(y)
+    print(x)
+    return untypy._check_return(None)
+
+@untypy.patch
+@decorated
+def baz(*args: int) -> int:
+    return 1
+
+@untypy.patch
+def gen(x: int) -> int:
+    yield x
+
+@untypy.patch
+class C:
+
+    @untypy.patch
+    def m(self, x: int) -> int:
+
+        @untypy._inline_checked
+        def f() -> int:
+            return untypy._check_return(x)
+        return f()
+        """
+        tree = ast.parse(src)
+        UntypyAstTransformer(inline_checks=True).visit(tree)
+        ast.fix_missing_locations(tree)
+        self.assertEqual(ast.unparse(tree), ast.unparse(ast.parse(target)))
+
+    def exec_inline(self, src):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(src)
+        self.addCleanup(os.remove, f.name)
+        tree = ast.parse(src)
+        UntypyAstTransformer(inline_checks=True).visit(tree)
+        ast.fix_missing_locations(tree)
+        globals = {'__name__': 'inline_checks_test'}
+        exec(compile(tree, f.name, 'exec'), globals)
+        return globals
+
+    def test_checks(self):
+        m = self.exec_inline("""
+def depth(n: int) -> int:
+    if n == 0:
+        return 0
+    return 1 + depth(n - 1)
+
+def no_return(x: int) -> int:
+    if x > 0:
+        return x
+
+def wrong_return(x: int) -> int:
+    return str(x)
+
+def first(xs: list[int]) -> int:
+    return xs[0]
+""")
+        # One frame per call
+        self.assertEqual(m['depth'](sys.getrecursionlimit() - 100), sys.getrecursionlimit() - 100)
+        self.assertEqual(m['first']([1]), 1)
+
+        def call():
+            m['depth']("1")
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            call()
+        self.assertEqual(cm.exception.given, "1")
+        self.assertIn('m[\'depth\']("1")', cm.exception.last_responsable().source_lines)
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            m['no_return'](0)
+        self.assertIn("Did you miss a return statement?", cm.exception.notes)
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            m['wrong_return'](1)
+        self.assertEqual(cm.exception.last_responsable().line_no, 12)
+
+        with self.assertRaises(UntypyTypeError):
+            m['first'](["x"])
+
+    def test_registry_is_pruned(self):
+        m = self.exec_inline("""
+def inc(x: int) -> int:
+    return x + 1
+
+def adder(n):
+    def add(x: int) -> int:
+        return x + n
+    return add
+""")
+        code = m['inc'].__code__
+        self.assertIn(code, InlineCheckedFunctions)
+        # The last definition of a nested function counts
+        add1 = m['adder'](1)
+        add2 = m['adder'](2)
+        add_code = add1.__code__
+        del add1
+        gc.collect()
+        self.assertEqual(add2(1), 3)
+        with self.assertRaises(UntypyTypeError):
+            add2("1")
+        del add2
+        # Functions defined again, for example in the REPL, do not stay alive
+        del m['inc']
+        gc.collect()
+        self.assertNotIn(code, InlineCheckedFunctions)
+        self.assertNotIn(add_code, InlineCheckedFunctions)
@@ -22,3 +22,16 @@ class TestRecursion(unittest.TestCase):
     def test_recursion(self):
         # should not fail
         C().foo(D())
+
+
+class TestPrecompiled(unittest.TestCase):
+
+    def test_take_precompiled(self):
+        from untypy.patching.import_hook import add_precompiled, take_precompiled
+        code = compile("x = 1", "m.py", "exec")
+        add_precompiled("m.py", b"x = 1", code)
+        self.assertIs(take_precompiled("m.py", b"x = 1"), code)
+        # Taken only once, and only for the same source
+        self.assertIsNone(take_precompiled("m.py", b"x = 1"))
+        add_precompiled("m.py", b"x = 1", code)
+        self.assertIsNone(take_precompiled("m.py", b"x = 2"))
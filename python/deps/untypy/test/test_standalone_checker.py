@@ -1,4 +1,5 @@
 import unittest
+from typing import Optional
 import untypy
 from untypy.error import UntypyTypeError, Location
 
@@ -18,4 +19,34 @@ class TestStandaloneChecker(unittest.TestCase):
 
         self.assertEqual(cm.exception.expected, 'int')
         self.assertEqual(cm.exception.last_declared(), Location.from_code(TestStandaloneChecker.test_standalone))
-        self.assertIn('myfunc("hello")', cm.exception.last_responsable().source_lines)
\ No newline at end of file
+        self.assertIn('myfunc("hello")', cm.exception.last_responsable().source_lines)
+
+    def test_accepted_types(self):
+        ch = untypy.checker(lambda: Optional[float], TestStandaloneChecker.test_accepted_types)
+        self.assertEqual(ch(1), 1)
+        self.assertEqual(ch(None), None)
+        self.assertEqual(frozenset([float, int, type(None)]), ch._accepted_types)
+
+        def myfunc(x):
+            ch(x)
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            myfunc("hello")
+        self.assertIn('myfunc("hello")', cm.exception.last_responsable().source_lines)
+
+        ch = untypy.checker(lambda: list[int], TestStandaloneChecker.test_accepted_types)
+        ch([1])
+        self.assertEqual(frozenset(), ch._accepted_types)
+
+    def test_check_many(self):
+        ch = untypy.checker(lambda: Optional[int], TestStandaloneChecker.test_check_many)
+        self.assertEqual([1, None, 3], ch.check_many(iter([1, None, 3])))
+
+        def myfunc(values):
+            ch.check_many(values)
+
+        with self.assertRaises(UntypyTypeError) as cm:
+            myfunc([1, 2, "three"])
+        self.assertEqual(cm.exception.given, "three")
+        self.assertIn("Value at index 2.", cm.exception.notes)
+        self.assertIn('myfunc([1, 2, "three"])', cm.exception.last_responsable().source_lines)
@@ -1,7 +1,10 @@
 import ast
+import sys
 import unittest
 
-from untypy.util.return_traces import ReturnTraceManager, ReturnTracesTransformer
+from untypy.util.return_traces import ReturnTraceManager, ReturnTracesTransformer, MonitoringTracer, \
+    MonitoringReturnTracer, \
+    register_returns, trace_returns, last_return_state, get_last_return
 
 
 class TestAstTransform(unittest.TestCase):
@@ -34,3 +37,117 @@ def foo(flag: bool) -> int:
         self.assertEqual(mgr.get(0), ("<dummyfile>", 5))
         self.assertEqual(mgr.get(1), ("<dummyfile>", 7))
 
+
+    def test_ast_transform_same_location_twice(self):
+        src = """
+def foo() -> int:
+    return 1
+        """
+        mgr = ReturnTraceManager()
+        for _ in range(2):
+            tree = ast.parse(src)
+            ReturnTracesTransformer("<dummyfile>", mgr).visit(tree)
+            ast.fix_missing_locations(tree)
+            self.assertIn('untypy._before_return(0)', ast.unparse(tree))
+        self.assertEqual(mgr.lst, [("<dummyfile>", 3)])
+
+
+    def test_reserve(self):
+        mgr = ReturnTraceManager()
+        mgr.next_id(ast.parse("return 1").body[0], "<file1>")
+        base = mgr.reserve(2)
+        self.assertEqual(base, 1)
+        other = ReturnTraceManager(start=base)
+        src = """
+def foo(flag: bool) -> int:
+    if flag:
+        return 1
+    return 2
+        """
+        tree = ast.parse(src)
+        ReturnTracesTransformer("<file2>", other).visit(tree)
+        self.assertIn('untypy._before_return(1)', ast.unparse(tree))
+        self.assertIn('untypy._before_return(2)', ast.unparse(tree))
+        mgr.fill(base, other.lst)
+        self.assertEqual({mgr.get(1), mgr.get(2)}, {("<file2>", 4), ("<file2>", 5)})
+        self.assertEqual(mgr.get(0), ("<file1>", 1))
+
+
+@unittest.skipIf(MonitoringTracer is None, "needs sys.monitoring (Python 3.12+)")
+class TestMonitoringReturnTraces(unittest.TestCase):
+
+    def test_last_return(self):
+        src = """
+def foo(flag):
+    if flag:
+        return 1
+    else:
+        return 'you stupid'
+
+def bar():
+    return 42
+
+def baz():
+    return 42
+        """
+        env = {}
+        exec(compile(src, "<dummyfile>", "exec"), env)
+        (foo, bar, baz) = (env['foo'], env['bar'], env['baz'])
+        for fn in [foo, bar]:
+            register_returns(fn)
+        call_foo = trace_returns(foo)
+        call_foo(True)
+        self.assertEqual(get_last_return(last_return_state(), foo), ("<dummyfile>", 4))
+        call_foo(False)
+        state = last_return_state()
+        self.assertEqual(get_last_return(state, foo), ("<dummyfile>", 6))
+        # Events are only enabled while foo is called through trace_returns
+        foo(True)
+        self.assertEqual(last_return_state(), state)
+        # bar has a single return, its calls need no events
+        self.assertIs(trace_returns(bar), bar)
+        self.assertEqual(get_last_return(state, bar), ("<dummyfile>", 9))
+        # baz is not registered, so its returns are unknown
+        self.assertEqual(get_last_return(state, baz), ("<nothing>", 0))
+
+    def test_lazy_tool_id(self):
+        src = """
+def foo(flag):
+    if flag:
+        return 1
+    return 2
+
+def bar():
+    return 42
+        """
+        env = {}
+        exec(compile(src, "<dummyfile>", "exec"), env)
+        (foo, bar) = (env['foo'], env['bar'])
+        # Occupy the free tool ids, so that claiming one fails
+        taken = [i for i in MonitoringReturnTracer.TOOL_IDS if sys.monitoring.get_tool(i) is None]
+        for i in taken:
+            sys.monitoring.use_tool_id(i, 'test')
+        try:
+            tracer = MonitoringReturnTracer()
+            tracer.register(foo.__code__)
+            tracer.register(bar.__code__)
+            # No events are needed for functions with a single return line
+            self.assertIs(tracer.traced(bar), bar)
+            self.assertIsNone(tracer.tool_id)
+            self.assertIs(tracer.traced(foo), foo)
+            self.assertIsNone(tracer.tool_id)
+        finally:
+            for i in taken:
+                sys.monitoring.free_tool_id(i)
+        if not taken:
+            return
+        tracer = MonitoringReturnTracer()
+        tracer.register(foo.__code__)
+        call_foo = tracer.traced(foo)
+        self.assertIsNotNone(tracer.tool_id)
+        try:
+            call_foo(False)
+            self.assertEqual(tracer.location(tracer.state(), foo), ("<dummyfile>", 5))
+        finally:
+            sys.monitoring.register_callback(tracer.tool_id, sys.monitoring.events.PY_RETURN, None)
+            sys.monitoring.free_tool_id(tracer.tool_id)
@@ -1,16 +1,18 @@
 import ast
 import inspect
+import marshal
 import sys
 from types import ModuleType
 from typing import Optional, Any, Union, Callable
 
-from .patching import wrap_function, patch_class, wrap_class, DefaultConfig
+from .patching import wrap_function, patch_class, wrap_class, DefaultConfig, register_inline_checked, \
+    InlineCheckedFunctions
 from .patching.ast_transformer import UntypyAstTransformer, did_no_code_run_before_untypy_enable, \
     UntypyAstImportTransformer
-from .patching.import_hook import install_import_hook
 from .patching.standalone_checker import StandaloneChecker
 from .util.condition import FunctionCondition
-from .util.return_traces import ReturnTracesTransformer, before_return, GlobalReturnTraceManager
+from .util.return_traces import ReturnTracesTransformer, before_return, GlobalReturnTraceManager, \
+    uses_ast_return_traces, ReturnTraceManager, register_returns, ReturnRegistrationTransformer
 from .util.tranformer_combinator import TransformerCombinator
 
 GlobalConfig = DefaultConfig
@@ -18,16 +20,66 @@ GlobalConfig = DefaultConfig
 """
 This function is called before any return statement, to store which was the last return.
 For this the AST is transformed using ReturnTracesTransformer.
+On Python 3.12+, returns are recorded with sys.monitoring instead (see uses_ast_return_traces),
+functions with return statements are registered with _register_returns.
 Must be in untypy so it can be used in transformed module.
 Must also be in other module, so it can be used from inside (No circular imports).
 """
 _before_return = before_return
+_register_returns = register_returns
+
+def _return_traces_transformers(file, manager=GlobalReturnTraceManager) -> list[ast.NodeTransformer]:
+    if uses_ast_return_traces():
+        return [ReturnTracesTransformer(file, manager)]
+    else:
+        return [ReturnRegistrationTransformer()]
+
+
+_inline_checks = False
+
+def enable_inline_checks(enabled: bool = True) -> None:
+    """
+    With inline checks, functions of modules transformed afterwards check their arguments
+    and results in their body instead of being wrapped (see UntypyAstTransformer).
+    """
+    global _inline_checks
+    _inline_checks = enabled
+
+
+def inline_checks_enabled() -> bool:
+    return _inline_checks
+
+
+"""
+These functions are called by functions with inline checks, see UntypyAstTransformer.
+"""
+def _inline_checked(fn):
+    return register_inline_checked(fn, GlobalConfig)
+
+
+def _check_arguments(*args):
+    frame = sys._getframe(1)
+    fn = InlineCheckedFunctions[frame.f_code]
+    for (arg, accepted) in zip(args, fn.inline_argument_types):
+        if type(arg) not in accepted:
+            return fn.check_arguments_inline(args, frame.f_back)
+    return args
 
-_importhook_transformer_builder = lambda path, file: TransformerCombinator(UntypyAstTransformer(),
-                                                                           ReturnTracesTransformer(file))
+
+def _check_return(ret):
+    frame = sys._getframe(1)
+    fn = InlineCheckedFunctions[frame.f_code]
+    if type(ret) in fn.inline_return_types:
+        return ret
+    return fn.check_return_inline(ret, frame)
+
+
+_importhook_transformer_builder = lambda path, file: TransformerCombinator(UntypyAstTransformer(_inline_checks),
+                                                                           *_return_traces_transformers(file))
 
 def just_install_hook(prefixes=[]):
     global GlobalConfig
+    from .patching.import_hook import install_import_hook
 
     def predicate(module_name):
         for p in prefixes:
@@ -41,9 +93,49 @@ def just_install_hook(prefixes=[]):
     install_import_hook(predicate, _importhook_transformer_builder)
 
 
+def reserve_return_traces(data: bytes) -> int:
+    """
+    Reserves ids for the return statements of a module that is precompiled in another process.
+    Every return statement contains the keyword, so counting it gives an upper bound.
+    :param data: the source of the module
+    :return: the first id, pass it to precompile
+    """
+    from importlib.util import decode_source
+    if not uses_ast_return_traces():
+        return 0
+    return GlobalReturnTraceManager.reserve(decode_source(data).count('return'))
+
+
+def precompile(path: str, data: bytes, return_trace_base: int = 0, inline_checks: bool = False) -> (bytes, list):
+    """
+    Transforms and compiles a module in the same way as the import hook of just_install_hook.
+    This function may run in a worker process, it does not modify global state.
+    :param inline_checks: pass inline_checks_enabled() of the process using the module
+    :return: the marshalled code object and the return locations, pass them to add_precompiled
+    """
+    from importlib.util import decode_source
+    from .patching.import_hook import transform_source
+    manager = ReturnTraceManager(start=return_trace_base)
+    transformer = TransformerCombinator(UntypyAstTransformer(inline_checks),
+                                        *_return_traces_transformers(path, manager))
+    code = transform_source(decode_source(data), path, transformer)
+    return marshal.dumps(code), manager.lst
+
+
+def add_precompiled(path: str, data: bytes, code: bytes, return_traces: list, return_trace_base: int = 0):
+    """
+    Registers the result of precompile. The import hook then uses the code object
+    instead of transforming the module again, as long as its source is still data.
+    """
+    from .patching import import_hook
+    GlobalReturnTraceManager.fill(return_trace_base, return_traces)
+    import_hook.add_precompiled(path, data, marshal.loads(code))
+
+
 def transform_tree(tree, file):
-    UntypyAstTransformer().visit(tree)
-    ReturnTracesTransformer(file).visit(tree)
+    UntypyAstTransformer(_inline_checks).visit(tree)
+    for t in _return_traces_transformers(file):
+        t.visit(tree)
     ast.fix_missing_locations(tree)
 
 
@@ -51,6 +143,7 @@ def enable(*, recursive: bool = True, root: Union[ModuleType, str, None] = None,
     global GlobalConfig
     caller = _find_calling_module()
     exit_after = False
+    from .patching.import_hook import install_import_hook
 
     if root is None:
         root = caller
@@ -88,6 +181,7 @@ def enable_on_imports(*prefixes):
     print("!!!! THIS FEATURE HAS UNEXPECTED SIDE EFFECTS WHEN IMPORTING ABSOLUTE SUBMODULES !!!")
     # TODO: Fix import of submodules should not change parent module.
     global GlobalConfig
+    from .patching.import_hook import install_import_hook
     GlobalConfig = DefaultConfig._replace(checkedprefixes=[*prefixes])
     caller = _find_calling_module()
 
@@ -117,7 +211,8 @@ def _exec_module_patched(mod: ModuleType, exit_after: bool, transformer: ast.Nod
                              "\tuntypy.enable()")
 
     transformer.visit(tree)
-    ReturnTracesTransformer(mod.__file__).visit(tree)
+    for t in _return_traces_transformers(mod.__file__):
+        t.visit(tree)
     ast.fix_missing_locations(tree)
     patched_mod = compile(tree, mod.__file__, 'exec', dont_inherit=True, optimize=-1)
     stack = list(map(lambda s: s.frame, inspect.stack()))
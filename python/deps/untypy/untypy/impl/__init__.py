@@ -1,50 +1,56 @@
+import importlib
 import inspect
 from typing import Any, Optional, TypeVar, List, Dict
 
-from untypy.interfaces import CreationContext, TypeChecker
-from .annotated import AnnotatedFactory
-from .any import AnyFactory
-from .callable import CallableFactory
-from .dummy_delayed import DummyDelayedFactory
-from .generator import GeneratorFactory
-from .generic import GenericFactory
-from .interface import InterfaceFactory
-from .iterator import IteratorFactory
-from .list import ListFactory
-from .literal import LiteralFactory
-from .none import NoneFactory
-from .optional import OptionalFactory
-from .protocol import ProtocolFactory
-from .sequence import SequenceFactory
-from .simple import SimpleFactory
-from .string_forward_refs import StringForwardRefFactory
-from .tuple import TupleFactory
-from .union import UnionFactory
+from untypy.interfaces import CreationContext, TypeChecker, TypeCheckerFactory
 from ..error import Location, UntypyAttributeError
 
 # More Specific Ones First
-_FactoryList = [
-    AnyFactory(),
-    NoneFactory(),
-    AnnotatedFactory(),
-    ProtocolFactory(),  # must be higher then Generic
-    GenericFactory(),
-    CallableFactory(),
-    ListFactory(),
-    LiteralFactory(),
-    OptionalFactory(),  # must be higher then Union
-    UnionFactory(),
-    TupleFactory(),
-    SequenceFactory(),
-    DummyDelayedFactory(),
-    GeneratorFactory(),
-    IteratorFactory(),
-    InterfaceFactory(),
-    StringForwardRefFactory(),  # resolve types passed as strings
+# The factories are given as (module, class) and are only imported when the first
+# checker is created. This keeps `import untypy` cheap for programs without annotations.
+_FactoryNames = [
+    ('any', 'AnyFactory'),
+    ('none', 'NoneFactory'),
+    ('annotated', 'AnnotatedFactory'),
+    ('protocol', 'ProtocolFactory'),  # must be higher then Generic
+    ('generic', 'GenericFactory'),
+    ('callable', 'CallableFactory'),
+    ('list', 'ListFactory'),
+    ('literal', 'LiteralFactory'),
+    ('optional', 'OptionalFactory'),  # must be higher then Union
+    ('union', 'UnionFactory'),
+    ('tuple', 'TupleFactory'),
+    ('sequence', 'SequenceFactory'),
+    ('dummy_delayed', 'DummyDelayedFactory'),
+    ('generator', 'GeneratorFactory'),
+    ('iterator', 'IteratorFactory'),
+    ('interface', 'InterfaceFactory'),
+    ('string_forward_refs', 'StringForwardRefFactory'),  # resolve types passed as strings
     # must come last
-    SimpleFactory()
+    ('simple', 'SimpleFactory'),
 ]
 
+_FactoryList: Optional[List[TypeCheckerFactory]] = None
+
+
+def _factory_class(mod: str, name: str) -> type:
+    return getattr(importlib.import_module('.' + mod, __name__), name)
+
+
+def _factories() -> List[TypeCheckerFactory]:
+    global _FactoryList
+    if _FactoryList is None:
+        _FactoryList = [_factory_class(mod, name)() for (mod, name) in _FactoryNames]
+    return _FactoryList
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps `from untypy.impl import ListFactory` working without eager imports.
+    for (mod, cls) in _FactoryNames:
+        if cls == name:
+            return _factory_class(mod, cls)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class DefaultCreationContext(CreationContext):
 
@@ -59,7 +65,7 @@ class DefaultCreationContext(CreationContext):
         return self.declared
 
     def find_checker(self, annotation: Any) -> Optional[TypeChecker]:
-        for fac in _FactoryList:
+        for fac in _factories():
             res = fac.create_from(annotation=annotation, ctx=self)
             if res is not None:
                 return res
@@ -8,6 +8,7 @@ from untypy.interfaces import TypeChecker, TypeCheckerFactory, CreationContext,
     WrappedFunctionContextProvider
 # These Types are prefixed with an underscore...
 from untypy.util import ArgumentExecutionContext, ReturnExecutionContext
+from untypy.util.return_traces import trace_returns
 
 CallableTypeOne = type(Callable[[], None])
 CallableTypeTwo = type(AbcCallable[[], None])
@@ -79,6 +80,7 @@ class TypedCallable(Callable, WrappedFunction):
         self.argument_checker = argument_checker
         self.ctx = ctx
         self.fn = WrappedFunction.find_original(self.inner)
+        self.call_fn = trace_returns(self.fn)
         setattr(self, '__wf', self)
 
     def __call__(self, *args, **kwargs):
@@ -95,7 +97,7 @@ class TypedCallable(Callable, WrappedFunction):
                                                                                                  self.ctx),
                                                               args, kwargs)
 
-        ret = self.fn(*args, **kwargs)
+        ret = self.call_fn(*args, **kwargs)
         if isinstance(self.inner, WrappedFunction):
             ret = self.inner.wrap_return(ret, bind2, TypedCallableReturnExecutionContext(self.ctx, self, True))
 
@@ -20,6 +20,9 @@ class NoneChecker(TypeChecker):
         else:
             raise ctx.wrap(UntypyTypeError(arg, self.describe()))
 
+    def accepted_types(self) -> frozenset:
+        return frozenset([type(None)])
+
     def describe(self) -> str:
         return "None"
 
@@ -32,6 +32,9 @@ class OptionalChecker(TypeChecker):
             ctx = OptionalExecutionContext(upper, [self.inner], 0)
             return self.inner.check_and_wrap(arg, ctx)
 
+    def accepted_types(self) -> frozenset:
+        return self.inner.accepted_types() | frozenset([type(None)])
+
     def describe(self) -> str:
         return f"Optional[{self.inner.describe()}]"
 
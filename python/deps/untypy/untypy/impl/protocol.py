@@ -8,6 +8,7 @@ from untypy.impl.any import SelfChecker, AnyChecker
 from untypy.interfaces import TypeCheckerFactory, CreationContext, TypeChecker, ExecutionContext, \
     WrappedFunctionContextProvider
 from untypy.util import WrappedFunction, ArgumentExecutionContext, ReturnExecutionContext
+from untypy.util.return_traces import trace_returns
 from untypy.util.condition import FunctionCondition
 from untypy.util.typehints import get_type_hints
 
@@ -248,6 +249,7 @@ class ProtocolWrappedFunction(WrappedFunction):
 
     def build(self):
         fn = WrappedFunction.find_original(self.inner)
+        call_fn = trace_returns(fn)
 
         fn_of_protocol = getattr(self.protocol.proto, fn.__name__)
         if hasattr(fn_of_protocol, '__wf'):
@@ -266,7 +268,7 @@ class ProtocolWrappedFunction(WrappedFunction):
                                                                                                    inner_object,
                                                                                                    inner_ctx),
                                                                   args, kwargs)
-            ret = fn(*args, **kwargs)
+            ret = call_fn(*args, **kwargs)
             if isinstance(self.inner, WrappedFunction):
                 ret = self.inner.wrap_return(ret, bind2, ProtocolReturnExecutionContext(self,
                                                                                         ResponsibilityType.IN,
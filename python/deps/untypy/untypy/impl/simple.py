@@ -71,6 +71,16 @@ class SimpleChecker(TypeChecker):
         else:
             raise ctx.wrap(UntypyTypeError(arg, self.describe()))
 
+    def accepted_types(self) -> frozenset:
+        # See simpleTypeCompat
+        if self.always_wrap:
+            return frozenset()
+        elif self.annotation is float:
+            return frozenset([float, int])
+        elif self.annotation is complex:
+            return frozenset([complex, float, int])
+        return frozenset([self.annotation])
+
     def describe(self) -> str:
         return self.annotation.__name__
 
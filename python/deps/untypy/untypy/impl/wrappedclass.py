@@ -9,6 +9,7 @@ from untypy.impl.any import SelfChecker, AnyChecker
 from untypy.interfaces import TypeChecker, CreationContext, ExecutionContext, WrappedFunction, \
     WrappedFunctionContextProvider
 from untypy.util import ArgumentExecutionContext, ReturnExecutionContext
+from untypy.util.return_traces import trace_returns
 
 
 def find_signature(member, ctx: CreationContext):
@@ -52,6 +53,36 @@ def wrap_arguments(signature: inspect.signature, checker: dict[str, TypeChecker]
     return bindings.args, bindings.kwargs
 
 
+class LazyWrappedMember:
+    """
+    Placeholder for a member of a class created by WrappedType. On first access, the
+    wrapper is built and replaces the placeholder in the class, so inspect.signature and
+    the checkers are only computed for members that are actually used.
+    """
+
+    def __init__(self, build: Callable[[], Any]):
+        self.build = build
+        self.owner = None
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, cls=None):
+        try:
+            setattr(self.owner, self.name, self.build())
+        except ValueError:
+            # this fails sometimes on built-ins.
+            # "ValueError: no signature found for builtin"
+            # Behave as if the member was never wrapped.
+            delattr(self.owner, self.name)
+        if instance is None:
+            return getattr(cls if cls is not None else self.owner, self.name)
+        else:
+            return getattr(instance, self.name)
+
+
 def WrappedType(template: Union[type, ModuleType], ctx: CreationContext, *,
                 implementation_template: Union[type, ModuleType, None] = None,
                 create_type: Optional[type] = None,
@@ -77,6 +108,7 @@ def WrappedType(template: Union[type, ModuleType], ctx: CreationContext, *,
 
         create_fn = raise_err
 
+    # The members are only wrapped on first access, see LazyWrappedMember.
     list_of_attr = dict()
     for attr in dir(template):
         if attr in blacklist:
@@ -85,19 +117,17 @@ def WrappedType(template: Union[type, ModuleType], ctx: CreationContext, *,
         original = getattr(template, attr)
         if type(original) == type:  # Note: Order matters, types are also callable
             if type(template) is type:
-                list_of_attr[attr] = WrappedType(original, ctx)
+                list_of_attr[attr] = LazyWrappedMember(lambda original=original: WrappedType(original, ctx))
 
         elif callable(original):
-            try:
-                (signature, checker) = find_signature(original, ctx)
-                implementation_fn = getattr(implementation_template, attr)
-                if implementation_fn is not None:
-                    list_of_attr[attr] = WrappedClassFunction(implementation_fn, signature, checker,
-                                                              create_fn=create_fn, declared=declared).build()
-            except ValueError as e:
-                # this fails sometimes on built-ins.
-                # "ValueError: no signature found for builtin"
-                pass
+            implementation_fn = getattr(implementation_template, attr)
+            if implementation_fn is not None:
+                def build(original=original, implementation_fn=implementation_fn):
+                    (signature, checker) = find_signature(original, ctx)
+                    return WrappedClassFunction(implementation_fn, signature, checker,
+                                                create_fn=create_fn, declared=declared).build()
+
+                list_of_attr[attr] = LazyWrappedMember(build)
     out = None
     if type(template) is type:
         if name is None:
@@ -124,9 +154,11 @@ class WrappedClassFunction(WrappedFunction):
         self.fc = None
         if hasattr(self.inner, "__fc"):
             self.fc = getattr(self.inner, "__fc")
+        self.call_inner = trace_returns(self.inner)
 
     def build(self):
         fn = self.inner
+        call_fn = self.call_inner
         name = fn.__name__
 
         def wrapper_cls(*args, **kwargs):
@@ -134,7 +166,7 @@ class WrappedClassFunction(WrappedFunction):
             (args, kwargs, bindings) = self.wrap_arguments(
                 lambda n: ArgumentExecutionContext(wrapper_cls, caller, n, declared=self.declared()),
                 args, kwargs)
-            ret = fn(*args, **kwargs)
+            ret = call_fn(*args, **kwargs)
             return self.wrap_return(ret, bindings, ReturnExecutionContext(self))
 
         def wrapper_self(me, *args, **kwargs):
@@ -145,7 +177,7 @@ class WrappedClassFunction(WrappedFunction):
             (args, kwargs, bindings) = self.wrap_arguments(
                 lambda n: ArgumentExecutionContext(wrapper_self, caller, n, declared=self.declared()),
                 (me.__inner, *args), kwargs)
-            ret = fn(*args, **kwargs)
+            ret = call_fn(*args, **kwargs)
             if me.__return_ctx is None:
                 return self.wrap_return(ret, bindings, ReturnExecutionContext(self))
             else:
@@ -45,6 +45,11 @@ class TypeChecker:
     def may_be_wrapped(self) -> bool:
         return False
 
+    # Types whose instances are returned unchanged by check_and_wrap, independent of the
+    # execution context. Used for fast paths, so it may be incomplete.
+    def accepted_types(self) -> frozenset:
+        return frozenset()
+
     def base_type(self) -> list[Any]:
         raise NotImplementedError
 
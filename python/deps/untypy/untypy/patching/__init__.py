@@ -5,10 +5,8 @@ from typing import Callable, Protocol
 
 from untypy.error import Location
 from untypy.impl import DefaultCreationContext
-from untypy.impl.bound_generic import WrappedGenericAlias
-from untypy.impl.wrappedclass import WrappedType
 from untypy.interfaces import WrappedFunction
-from untypy.util.typedfunction import TypedFunctionBuilder
+from untypy.util.typedfunction import TypedFunctionBuilder, InlineCheckedFunctionBuilder
 
 Config = namedtuple('PatchConfig', ['verbose', 'checkedprefixes'])
 DefaultConfig = Config(verbose=False, checkedprefixes=[""])
@@ -45,6 +43,7 @@ def patch_class(clas: type, cfg: Config):
     is_protocol = hasattr(clas, 'mro') and Protocol in clas.mro()
 
     if hasattr(clas, '__class_getitem__') and not is_protocol:
+        from untypy.impl.bound_generic import WrappedGenericAlias
         original = clas.__class_getitem__
         setattr(clas, '__class_getitem__', lambda *args: WrappedGenericAlias(original(*args), ctx))
 
@@ -61,7 +60,37 @@ def wrap_function(fn: FunctionType, cfg: Config) -> Callable:
         return fn
 
 
+# Maps the code objects of functions with inline checks to their InlineCheckedFunctionBuilder.
+# An entry is removed once the function defined last with the code object is collected.
+InlineCheckedFunctions = {}
+
+
+def _forget_inline_checked(builder: InlineCheckedFunctionBuilder):
+    if InlineCheckedFunctions.get(builder.code) is builder:
+        del InlineCheckedFunctions[builder.code]
+
+
+def register_inline_checked(fn: FunctionType, cfg: Config) -> FunctionType:
+    """
+    Registers fn, whose body checks its arguments and results (see UntypyAstTransformer).
+    If a nested function is defined again, the last definition counts.
+    """
+    previous = InlineCheckedFunctions.get(fn.__code__)
+    if previous is not None and previous.inner is not None and \
+            previous.inner.__annotations__ == fn.__annotations__:
+        # The checks of a nested function only depend on its annotations
+        previous.inner = fn
+        return fn
+    InlineCheckedFunctions[fn.__code__] = InlineCheckedFunctionBuilder(fn, DefaultCreationContext(
+        typevars=dict(),
+        declared_location=WrappedFunction.find_location(fn),
+        checkedpkgprefixes=cfg.checkedprefixes, eval_context=fn.__globals__),
+        _forget_inline_checked)
+    return fn
+
+
 def wrap_class(a: type, cfg: Config) -> Callable:
+    from untypy.impl.wrappedclass import WrappedType
     return WrappedType(a, DefaultCreationContext(
         typevars=dict(),
         declared_location=Location.from_code(a),
@@ -3,6 +3,27 @@ from typing import Callable, List, Optional, Any
 
 
 class UntypyAstTransformer(ast.NodeTransformer):
+    """
+    Adds the untypy.patch decorator to all functions and classes of a module.
+
+    With inline_checks, functions get no wrapper if possible. Instead, their arguments are
+    checked at the top of their body and their results are checked at each return:
+
+        @untypy._inline_checked
+        def f(x: int, y: str) -> int:
+            (x, y) = untypy._check_arguments(x, y)
+            ...
+            return untypy._check_return(result)
+
+    Calls of such functions need no extra frame. Methods, functions with decorators, with
+    *args or **kwargs, generators and coroutines are wrapped as usual. (Protocols and
+    subclasses check methods through their wrappers.)
+    """
+
+    def __init__(self, inline_checks: bool = False):
+        self.inline_checks = inline_checks
+        self.in_class = False
+
     def visit_Module(self, node: ast.Module):
         for i, child in enumerate(node.body):
             if isinstance(child, ast.ImportFrom) and child.module == '__future__':
@@ -19,13 +40,23 @@ class UntypyAstTransformer(ast.NodeTransformer):
         return node
 
     def visit_FunctionDef(self, node: ast.FunctionDef):
-        node.decorator_list.insert(0, ast.Attribute(ast.Name("untypy", ast.Load()), "patch", ast.Load()))
-        self.generic_visit(node)
+        inline = self.inline_checks and not self.in_class and _can_inline_checks(node)
+        (in_class, self.in_class) = (self.in_class, False)
+        if inline:
+            self.generic_visit(node)
+            _inline_checks(node)
+            node.decorator_list.insert(0, _untypy_attribute("_inline_checked"))
+        else:
+            node.decorator_list.insert(0, ast.Attribute(ast.Name("untypy", ast.Load()), "patch", ast.Load()))
+            self.generic_visit(node)
+        self.in_class = in_class
         return node
 
     def visit_ClassDef(self, node: ast.FunctionDef):
         node.decorator_list.insert(0, ast.Attribute(ast.Name("untypy", ast.Load()), "patch", ast.Load()))
+        (in_class, self.in_class) = (self.in_class, True)
         self.generic_visit(node)
+        self.in_class = in_class
         return node
 
     def visit_Expr(self, node: ast.Expr):
@@ -37,6 +68,84 @@ class UntypyAstTransformer(ast.NodeTransformer):
             return node
 
 
+def _untypy_attribute(name: str) -> ast.Attribute:
+    return ast.Attribute(ast.Name("untypy", ast.Load()), name, ast.Load())
+
+
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def _own_scope_nodes(node: ast.AST):
+    """
+    Yields the nodes below node that belong to its scope, i.e. not to nested functions,
+    lambdas or classes.
+    """
+    for child in ast.iter_child_nodes(node):
+        yield child
+        if not isinstance(child, _SCOPES):
+            yield from _own_scope_nodes(child)
+
+
+def _can_inline_checks(node: ast.FunctionDef) -> bool:
+    args = node.args
+    all_args = args.posonlyargs + args.args + args.kwonlyargs
+    if node.decorator_list or args.vararg is not None or args.kwarg is not None:
+        return False
+    if node.returns is None and all(a.annotation is None for a in all_args):
+        # untypy.patch does not wrap such functions
+        return False
+    # Returns of generators and coroutines are not their results
+    return not any(isinstance(n, (ast.Yield, ast.YieldFrom, ast.Await))
+                   for s in node.body for n in [s, *_own_scope_nodes(s)])
+
+
+class _InlineReturnTransformer(ast.NodeTransformer):
+    def visit_FunctionDef(self, node):
+        # Nested functions, lambdas and classes have their own returns
+        return node
+
+    visit_AsyncFunctionDef = visit_Lambda = visit_ClassDef = visit_FunctionDef
+
+    def visit_Return(self, node: ast.Return):
+        value = node.value if node.value is not None else ast.copy_location(ast.Constant(None), node)
+        call = ast.Call(_untypy_attribute("_check_return"), [value], [])
+        node.value = ast.copy_location(call, value)
+        return node
+
+
+def _set_location(node: ast.AST, line: int, col: int):
+    for n in ast.walk(node):
+        n.lineno = n.end_lineno = line
+        n.col_offset = n.end_col_offset = col
+
+
+def _inline_checks(node: ast.FunctionDef):
+    args = node.args
+    params = [a.arg for a in args.posonlyargs + args.args + args.kwonlyargs]
+    # Like TypedFunctionBuilder.checkers
+    if params and params[0] in ['self', 'cls']:
+        params = params[1:]
+    body = node.body
+    start = 0
+    if isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and \
+            isinstance(body[0].value.value, str):
+        start = 1  # docstring
+    for i in range(start, len(body)):
+        body[i] = _InlineReturnTransformer().visit(body[i])
+    if not isinstance(body[-1], ast.Return):
+        # Check the result None of falling off the end
+        ret = ast.Return(ast.Call(_untypy_attribute("_check_return"), [ast.Constant(None)], []))
+        _set_location(ret, body[-1].end_lineno, body[-1].col_offset)
+        body.append(ret)
+    if params:
+        # The check reports errors at the line of the def
+        check = ast.Assign([ast.Tuple([ast.Name(p, ast.Store()) for p in params], ast.Store())],
+                           ast.Call(_untypy_attribute("_check_arguments"),
+                                    [ast.Name(p, ast.Load()) for p in params], []))
+        _set_location(check, node.lineno, node.col_offset)
+        body.insert(start, check)
+
+
 class UntypyAstImportTransformer(ast.NodeTransformer):
     def __init__(self, predicate: Callable[[str], bool], module_path: List[str]):
         self.predicate = predicate
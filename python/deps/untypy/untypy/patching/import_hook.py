@@ -1,6 +1,9 @@
 import ast
 import importlib
+import os
 from collections.abc import Callable
+from types import CodeType
+from typing import Optional
 from importlib.abc import MetaPathFinder
 from importlib.machinery import SourceFileLoader
 from importlib.util import decode_source
@@ -39,6 +42,31 @@ class UntypyFinder(MetaPathFinder):
         return self.should_patch_predicate(module_name)
 
 
+def transform_source(source: str, path: str, transformer: ast.NodeTransformer, optimize=-1) -> CodeType:
+    tree = compile(source, path, 'exec', ast.PyCF_ONLY_AST,
+                   dont_inherit=True, optimize=optimize)
+    transformer.visit(tree)
+    ast.fix_missing_locations(tree)
+    return compile(tree, path, 'exec', dont_inherit=True, optimize=optimize)
+
+
+# Code objects transformed ahead of time, maps the real path of a module to its source
+# and the code object. See untypy.add_precompiled.
+_precompiled: dict[str, (bytes, CodeType)] = {}
+
+
+def add_precompiled(path: str, data: bytes, code: CodeType):
+    _precompiled[os.path.realpath(path)] = (data, code)
+
+
+def take_precompiled(path: str, data: bytes) -> Optional[CodeType]:
+    entry = _precompiled.pop(os.path.realpath(path), None)
+    # Compare the sources themselves, a hash collision must not run stale code
+    if entry is not None and entry[0] == data:
+        return entry[1]
+    return None
+
+
 class UntypyLoader(SourceFileLoader):
 
     def __init__(self, fullname, path, transformer: Callable[[str, str], ast.NodeTransformer]):
@@ -46,12 +74,12 @@ class UntypyLoader(SourceFileLoader):
         self.transformer = transformer
 
     def source_to_code(self, data, path, *, _optimize=-1):
+        code = take_precompiled(path, data)
+        if code is not None:
+            return code
         source = decode_source(data)
-        tree = compile(source, path, 'exec', ast.PyCF_ONLY_AST,
-                       dont_inherit=True, optimize=_optimize)
-        self.transformer(self.name.split('.'), self.path).visit(tree)
-        ast.fix_missing_locations(tree)
-        return compile(tree, path, 'exec', dont_inherit=True, optimize=_optimize)
+        return transform_source(source, path, self.transformer(self.name.split('.'), self.path),
+                                optimize=_optimize)
 
     def exec_module(self, module) -> None:
         # cache_from_source has to be patched to prevent load from cache
@@ -1,5 +1,5 @@
 import sys
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
 from untypy.error import Location, UntypyAttributeError, UntypyTypeError, Frame, UntypyNameError
 from untypy.impl import DefaultCreationContext
@@ -9,6 +9,7 @@ from untypy.interfaces import ExecutionContext
 class StandaloneChecker:
     def __init__(self, annotation: Callable[[], Any], declared: Any, cfg):
         self._checker = None
+        self._accepted_types = frozenset()
         self.annotation = annotation
         self.declared = declared
         self.cfg = cfg
@@ -31,15 +32,41 @@ class StandaloneChecker:
         checker = ctx.find_checker(annotation)
         if checker is None:
             raise ctx.wrap(UntypyAttributeError(f"\n\tUnsupported type annotation: {self.annotation}\n"))
+        self._accepted_types = checker.accepted_types()
         self._checker = checker
         return checker
 
     def __call__(self, val):
+        checker = self._checker
+        if checker is None:
+            checker = self.get_checker()
+        # Fast path without the frame and context, which are needed only for errors
+        if type(val) in self._accepted_types:
+            return val
         frame = sys._getframe(2)
-        checker = self.get_checker()
         ctx = StandaloneCheckerContext(frame, self.declared)
         return checker.check_and_wrap(val, ctx)
 
+    def check_many(self, values: Iterable[Any]) -> list[Any]:
+        """
+        Checks all values like calling the checker for every value, but captures the frame
+        of the caller only once. Errors name the index of the offending value.
+        """
+        checker = self._checker
+        if checker is None:
+            checker = self.get_checker()
+        accepted = self._accepted_types
+        ctx = StandaloneCheckerContext(sys._getframe(2), self.declared)
+        result = []
+        for (i, val) in enumerate(values):
+            if type(val) not in accepted:
+                try:
+                    val = checker.check_and_wrap(val, ctx)
+                except UntypyTypeError as e:
+                    raise e.with_note(f"Value at index {i}.") from None
+            result.append(val)
+        return result
+
     def __repr__(self):
         return f"<StandaloneChecker for {self.get_checker().describe()}>"
 
@@ -5,7 +5,7 @@ from typing import Optional, Union, List
 from untypy.error import UntypyTypeError, Frame, Location
 from untypy.interfaces import ExecutionContext, TypeChecker, WrappedFunction
 from untypy.util.display import IndicatorStr
-from untypy.util.return_traces import get_last_return
+from untypy.util.return_traces import get_last_return, last_return_state
 
 
 class ReplaceTypeExecutionContext(ExecutionContext):
@@ -104,8 +104,10 @@ class NoResponsabilityWrapper(ExecutionContext):
 class ReturnExecutionContext(ExecutionContext):
     fn: WrappedFunction
 
-    def __init__(self, fn: WrappedFunction):
-        self.reti_loc = get_last_return()
+    def __init__(self, fn: WrappedFunction, reti_loc: Optional[tuple[str, int]] = None):
+        # reti_loc is the location of the return statement, if known
+        self.reti_loc = reti_loc
+        self.return_state = last_return_state() if reti_loc is None else None
         self.fn = fn
 
     def wrap(self, err: UntypyTypeError) -> UntypyTypeError:
@@ -134,7 +136,10 @@ class ReturnExecutionContext(ExecutionContext):
                 last_line = responsable.line_no + responsable.line_span - 1
                 responsable = responsable.narrow_in_span((responsable.file, last_line))
             else:
-                responsable = responsable.narrow_in_span(self.reti_loc)
+                reti_loc = self.reti_loc
+                if reti_loc is None:
+                    reti_loc = get_last_return(self.return_state, original)
+                responsable = responsable.narrow_in_span(reti_loc)
 
         return err.with_frame(Frame(
             return_id.ty,
@@ -1,4 +1,6 @@
 import ast
+import sys
+import weakref
 from typing import *
 
 
@@ -6,16 +8,38 @@ class ReturnTraceManager:
     """
     Stores file & line_no to every return idx
     """
-    def __init__(self):
+    def __init__(self, start: int = 0):
+        # start is the first idx, used when transforming in another process (see reserve)
+        self.start = start
         self.lst = []
+        self.ids = {}
 
     def next_id(self, reti : ast.Return, file: str) -> int:
-        i = len(self.lst)
-        self.lst.append((file, reti.lineno))
+        # Transforming the same file again (e.g. in the REPL) must not grow the list.
+        loc = (file, reti.lineno)
+        i = self.ids.get(loc)
+        if i is None:
+            i = self.start + len(self.lst)
+            self.lst.append(loc)
+            self.ids[loc] = i
         return i
 
     def get(self, idx : int) -> (str, int):
-        return self.lst[idx]
+        return self.lst[idx - self.start]
+
+    def reserve(self, n: int) -> int:
+        """
+        Reserves n consecutive ids and returns the first one. The locations are
+        filled in later via fill.
+        """
+        base = self.start + len(self.lst)
+        self.lst.extend([("<nothing>", 0)] * n)
+        return base
+
+    def fill(self, base: int, locs: list[(str, int)]):
+        for i, loc in enumerate(locs):
+            self.lst[base - self.start + i] = loc
+            self.ids.setdefault(loc, base + i)
 
 GlobalReturnTraceManager = ReturnTraceManager()
 reti_loc: int = -1
@@ -26,14 +50,180 @@ def before_return(idx : int):
     reti_loc = idx
 
 
-def get_last_return() -> (str, int):
-    global reti_loc
-    if reti_loc < 0:
+class MonitoringReturnTracer:
+    """
+    Records returns with sys.monitoring (Python 3.12+) instead of ReturnTracesTransformer.
+
+    Only functions registered via register_returns count (see ReturnRegistrationTransformer),
+    just like only transformed code calls before_return. If all returns of a function are on
+    the same line, its line is known without recording anything. Otherwise, the wrapper calls the function with
+    PY_RETURN events enabled for its code object (see trace_returns), so the events are
+    only enabled while a return check is pending. The callback just remembers code object
+    and instruction offset, the line number is computed only if a return check has failed.
+
+    The tool id is claimed only when the first function with several return lines is
+    checked. If no tool id is free, such returns are not recorded and their location is
+    unknown.
+    """
+
+    # 0-2 and 5 are reserved for debuggers, coverage tools, profilers and optimizers.
+    TOOL_IDS = [3, 4]
+
+    def __init__(self):
+        self.tool_id = None
+        self.claim_failed = False
+        self.code = None
+        self.offset = 0
+        # code object -> lines of its return instructions
+        self.return_lines = weakref.WeakKeyDictionary()
+        # code object -> [number of running calls with events enabled]
+        self.running = weakref.WeakKeyDictionary()
+
+    def _claim_tool_id(self) -> bool:
+        if self.tool_id is not None:
+            return True
+        if self.claim_failed:
+            return False
+        for tool_id in self.TOOL_IDS:
+            if sys.monitoring.get_tool(tool_id) is not None:
+                continue
+            try:
+                sys.monitoring.use_tool_id(tool_id, 'untypy')
+            except ValueError:
+                continue  # claimed by another tool in the meantime
+            try:
+                sys.monitoring.register_callback(tool_id, sys.monitoring.events.PY_RETURN,
+                                                 self._on_return)
+            except Exception:
+                sys.monitoring.free_tool_id(tool_id)
+                continue
+            self.tool_id = tool_id
+            return True
+        self.claim_failed = True
+        return False
+
+    def _on_return(self, code, offset, retval):
+        self.code = code
+        self.offset = offset
+
+    def register(self, code):
+        if code not in self.return_lines:
+            self.return_lines[code] = _value_return_lines(code)
+
+    def traced(self, fn: Callable) -> Callable:
+        code = getattr(fn, '__code__', None)
+        lines = self.return_lines.get(code) if code is not None else None
+        if lines is None or len(lines) <= 1 or not self._claim_tool_id():
+            return fn
+        set_local_events = sys.monitoring.set_local_events
+        tool_id = self.tool_id
+        PY_RETURN = sys.monitoring.events.PY_RETURN
+        # Shared by all wrappers of functions with this code
+        running = self.running.setdefault(code, [0])
+
+        def call(*args, **kwargs):
+            if running[0] == 0:
+                set_local_events(tool_id, code, PY_RETURN)
+            running[0] += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                running[0] -= 1
+                if running[0] == 0:
+                    set_local_events(tool_id, code, 0)
+
+        return call
+
+    def state(self):
+        return (self.code, self.offset)
+
+    def location(self, state, fn) -> (str, int):
+        code = getattr(fn, '__code__', None)
+        lines = self.return_lines.get(code) if code is not None else None
+        if not lines:
+            return ("<nothing>", 0)
+        if len(lines) == 1:
+            return (code.co_filename, next(iter(lines)))
+        (last_code, offset) = state
+        if last_code is not code:
+            return ("<nothing>", 0)
+        for (start, end, line) in code.co_lines():
+            if start <= offset < end and line is not None:
+                return (code.co_filename, line)
+        return ("<nothing>", 0)
+
+
+def _value_return_lines(code) -> frozenset[int]:
+    """
+    The lines of the return instructions of code, except for those that return None:
+    ReturnExecutionContext does not use the location of a return with result None.
+    """
+    import dis
+    lines = set()
+    prev = None
+    for i in dis.get_instructions(code):
+        if i.opname == 'RETURN_CONST' and i.argval is not None or \
+                i.opname == 'RETURN_VALUE' and not (prev is not None and prev.opname == 'LOAD_CONST'
+                                                    and prev.argval is None):
+            lines.add(i.positions.lineno)
+        prev = i
+    return frozenset(lines)
+
+
+MonitoringTracer = MonitoringReturnTracer() if hasattr(sys, 'monitoring') else None
+
+
+def uses_ast_return_traces() -> bool:
+    """
+    True if returns must be recorded by inserting untypy._before_return calls
+    with ReturnTracesTransformer (Python < 3.12).
+    """
+    return MonitoringTracer is None
+
+
+def register_returns(fn: Any) -> Any:
+    """
+    Registers a function with return statements, see ReturnRegistrationTransformer.
+    """
+    if MonitoringTracer is not None:
+        code = getattr(fn, '__code__', None)
+        if code is not None:
+            MonitoringTracer.register(code)
+    return fn
+
+
+def trace_returns(fn: Any) -> Any:
+    """
+    Returns the callable a wrapper has to call instead of fn, so that the return
+    of fn is recorded (see MonitoringReturnTracer).
+    """
+    if MonitoringTracer is not None:
+        return MonitoringTracer.traced(fn)
+    return fn
+
+
+def last_return_state() -> Any:
+    """
+    The state of the last recorded return, call directly after the return.
+    """
+    if MonitoringTracer is not None:
+        return MonitoringTracer.state()
+    return reti_loc
+
+
+def get_last_return(state: Any, fn: Any) -> (str, int):
+    """
+    The location of the return recorded in state (see last_return_state).
+    :param fn: the function that has returned
+    """
+    if MonitoringTracer is not None:
+        return MonitoringTracer.location(state, fn)
+    if state < 0:
         return ("<nothing>", 0) # this will never match any real location
 
     # Note: this location is only used if it is in the span of the located function.
     # See ReturnExecutionContext
-    return GlobalReturnTraceManager.get(reti_loc)
+    return GlobalReturnTraceManager.get(state)
 
 
 class ReturnTracesTransformer(ast.NodeTransformer):
@@ -73,3 +263,30 @@ class ReturnTracesTransformer(ast.NodeTransformer):
 
         super(ast.NodeTransformer, self).generic_visit(node)
 
+
+
+class ReturnRegistrationTransformer(ast.NodeTransformer):
+    """
+    The counterpart of ReturnTracesTransformer for sys.monitoring: decorates every function
+    with return statements with untypy._register_returns.
+    """
+
+    def visit_FunctionDef(self, node) -> Any:
+        self.generic_visit(node)
+        if _has_return(node):
+            # Innermost decorator, it must see the function itself
+            node.decorator_list.append(
+                ast.Attribute(value=ast.Name(id='untypy', ctx=ast.Load()), attr='_register_returns', ctx=ast.Load()))
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+
+def _has_return(node) -> bool:
+    for child in ast.iter_child_nodes(node):
+        if type(child) is ast.Return:
+            return True
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)) \
+                and _has_return(child):
+            return True
+    return False
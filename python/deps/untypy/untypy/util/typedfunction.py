@@ -1,5 +1,6 @@
 import inspect
 import sys
+import weakref
 from typing import Callable, Dict, Optional
 
 from untypy.error import UntypyAttributeError, UntypyNameError, UntypyTypeError
@@ -7,6 +8,7 @@ from untypy.impl.any import SelfChecker
 from untypy.interfaces import WrappedFunction, TypeChecker, CreationContext, WrappedFunctionContextProvider, \
     ExecutionContext
 from untypy.util import ArgumentExecutionContext, ReturnExecutionContext
+from untypy.util.return_traces import trace_returns
 from untypy.util.typehints import get_type_hints
 
 
@@ -18,12 +20,24 @@ class TypedFunctionBuilder(WrappedFunction):
     special_args = ['self', 'cls']
     method_name_ignore_return = ['__init__']
 
-    def __init__(self, inner: Callable, ctx: CreationContext):
+    def __init__(self, inner: Callable, ctx: CreationContext, inline: bool = False):
+        """
+        :param inline: inner checks its arguments and results itself (see UntypyAstTransformer)
+        """
         self.inner = inner
         self.signature = inspect.signature(inner)
         self.ctx = ctx
         self.fc = None
         self._checkers = None
+        self._fast_path = None
+        self._inline_plan = None
+        if inline:
+            # Until the annotations are resolved by inline_plan, every value is checked.
+            params = list(self.signature.parameters)
+            if len(params) > 0 and params[0] in self.special_args:
+                params = params[1:]
+            self.inline_argument_types = [frozenset()] * len(params)
+            self.inline_return_types = frozenset()
 
         try:
             # try to detect errors like missing arguments as early as possible.
@@ -36,6 +50,10 @@ class TypedFunctionBuilder(WrappedFunction):
         if hasattr(self.inner, "__fc"):
             self.fc = getattr(self.inner, "__fc")
 
+        if not inline:
+            # Inline checks know the location of the return statement, only wrappers call inner
+            self.call_inner = trace_returns(self.inner)
+
     def checkers(self) -> Dict[str, TypeChecker]:
         if self._checkers is not None:
             return self._checkers
@@ -80,13 +98,80 @@ class TypedFunctionBuilder(WrappedFunction):
         self._checkers = checkers
         return checkers
 
+    def fast_path(self):
+        """
+        Returns (argument_types, return_types) for calls that need no binding and no
+        execution contexts: all arguments are passed positionally and the type of each
+        argument is in argument_types (None accepts everything). The result is returned
+        directly if its type is in return_types (or return_types is None).
+        argument_types is None if there is no fast path for this function.
+        """
+        if self._fast_path is not None:
+            return self._fast_path
+        checkers = self.checkers()
+        params = list(self.signature.parameters.values())
+        arg_types = []
+        for p in params:
+            if p.kind not in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD):
+                arg_types = None
+                break
+            checker = checkers[p.name]
+            arg_types.append(None if isinstance(checker, SelfChecker) else checker.accepted_types())
+        if self.fc is not None or (arg_types is not None and any(t is not None and not t for t in arg_types)):
+            # Conditions need the bindings, some argument is never accepted without context.
+            arg_types = None
+        return_checker = checkers['return']
+        return_types = None if isinstance(return_checker, SelfChecker) else return_checker.accepted_types()
+        self._fast_path = (arg_types, return_types)
+        return self._fast_path
+
+    def inline_plan(self):
+        """
+        Returns the checks of a function with inline checks (see untypy._check_arguments):
+        (name, checker) for every parameter except self or cls, in the order of the
+        signature. Also sets inline_argument_types and inline_return_types, the exact
+        types of arguments and results that need no check.
+        """
+        if self._inline_plan is not None:
+            return self._inline_plan
+        checkers = self.checkers()
+        self._inline_plan = [(name, checkers[name]) for name in self.signature.parameters
+                             if not isinstance(checkers[name], SelfChecker)]
+        self.inline_argument_types = [checker.accepted_types() for (_, checker) in self._inline_plan]
+        self.inline_return_types = checkers['return'].accepted_types()
+        return self._inline_plan
+
+    def check_arguments_inline(self, values: tuple, caller) -> tuple:
+        result = list(values)
+        for (i, (name, checker)) in enumerate(self.inline_plan()):
+            if type(values[i]) not in self.inline_argument_types[i]:
+                ctx = ArgumentExecutionContext(self, caller, name)
+                result[i] = checker.check_and_wrap(values[i], ctx)
+        return tuple(result)
+
+    def check_return_inline(self, ret, frame):
+        check = self.checkers()['return']
+        self.inline_plan()
+        if isinstance(check, SelfChecker) or type(ret) in self.inline_return_types:
+            return ret
+        ctx = ReturnExecutionContext(self, (frame.f_code.co_filename, frame.f_lineno))
+        return check.check_and_wrap(ret, ctx)
+
     def build(self):
         def wrapper(*args, **kwargs):
+            if not kwargs:
+                (arg_types, return_types) = self.fast_path()
+                if arg_types is not None and len(args) == len(arg_types) and \
+                        all(t is None or type(a) in t for (t, a) in zip(arg_types, args)):
+                    ret = self.call_inner(*args)
+                    if return_types is None or type(ret) in return_types:
+                        return ret
+                    return self.wrap_return(ret, None, ReturnExecutionContext(self))
             # first is this fn
             caller = sys._getframe(1)
             (args, kwargs, bindings) = self.wrap_arguments(lambda n: ArgumentExecutionContext(self, caller, n), args,
                                                            kwargs)
-            ret = self.inner(*args, **kwargs)
+            ret = self.call_inner(*args, **kwargs)
             ret = self.wrap_return(ret, bindings, ReturnExecutionContext(self))
             return ret
 
@@ -131,3 +216,28 @@ class TypedFunctionBuilder(WrappedFunction):
 
     def checker_for(self, name: str) -> TypeChecker:
         return self.checkers()[name]
+
+
+class InlineCheckedFunctionBuilder(TypedFunctionBuilder):
+    """
+    TypedFunctionBuilder of a function with inline checks. The function is referenced only
+    weakly, on_collect(builder) is called once the function has been collected.
+    """
+
+    def __init__(self, inner: Callable, ctx: CreationContext, on_collect: Callable):
+        self.on_collect = on_collect
+        super().__init__(inner, ctx, inline=True)
+
+    @property
+    def inner(self):
+        return self._inner_ref()
+
+    @inner.setter
+    def inner(self, fn):
+        self.code = fn.__code__
+        self._inner_ref = weakref.ref(fn, self._collected)
+
+    def _collected(self, ref):
+        # Functions replaced by a later definition do not count
+        if ref is self._inner_ref:
+            self.on_collect(self)
@@ -1,6 +1,10 @@
 import shell
 import unittest
 import os
+import sys
+import json
+import subprocess
+import time
 
 def runWithFlags(path, flags, onError, input=''):
     cmd = f'python3 src/runYourProgram.py {" ".join(flags)} {path}'
@@ -132,6 +136,186 @@ class StudentSubmissionTests(unittest.TestCase):
         self.check("test-data/student-submission.py",
                    "test-data/student-submission-tests-tyerror.py", 0, tycheck=False)
 
+    def test_testFunctions(self):
+        testFile = 'test-data/student-submission-tests-functions.py'
+        self.check('test-data/student-submission.py', testFile, 0)
+        for jobs in ['1', '3']:
+            res = runWithFlags('test-data/student-submission-bad.py',
+                               ['--check', '--test-jobs', jobs, '--test-file', testFile],
+                               onError='ignore')
+            self.assertEqual(1, res.exitcode)
+            self.assertIn('Tutor:  5 Tests, 5 Fehler', res.stdout)
+            lines = [l for l in res.stdout.split('\n') if l.startswith('FEHLER')]
+            self.assertEqual(5, len(lines))
+            self.assertEqual(sorted(lines, key=lambda l: int(l.split(':')[1])), lines)
+        # Test functions are only called with --test-jobs
+        res = runWithFlags('test-data/student-submission-bad.py',
+                           ['--check', '--test-file', testFile], onError='ignore')
+        self.assertIn('Tutor:  1 Tests, 1 Fehler', res.stdout)
+
+    def test_testHelper(self):
+        # A test file with a helper named test_* is not affected by test functions
+        testFile = 'test-data/student-submission-tests-helper.py'
+        for flags in [[], ['--test-jobs', '2']]:
+            res = runWithFlags('test-data/student-submission.py',
+                               ['--check', *flags, '--test-file', testFile], onError='raise')
+            self.assertIn('Tutor:  2 Tests, alle erfolgreich', res.stdout)
+
+    def test_batch(self):
+        d = shell.mkTempDir(prefix='wypp-batch-tests')
+        for f in ['student-submission.py', 'student-submission-bad.py',
+                  'student-submission-tyerror.py']:
+            shell.cp(os.path.join('test-data', f), d)
+        shell.mkdir(os.path.join(d, 'group'))
+        shell.cp('test-data/student-submission.py', os.path.join(d, 'group', 'main.py'))
+        report = os.path.join(d, 'report.json')
+        shell.run(f'python3 src/runYourProgram.py --batch {d} --jobs 2 --report {report} '
+                  f'--test-file test-data/student-submission-tests.py main.py {LOG_REDIR}')
+        with open(report) as f:
+            r = json.load(f)
+        self.assertEqual({'submissions': 4, 'passed': 2, 'studentTotal': 0, 'studentFailing': 0,
+                          'tutorTotal': 3, 'tutorFailing': 1, 'typeErrors': 1, 'crashes': 0,
+                          'limitExceeded': 0},
+                         r['summary'])
+        results = {os.path.relpath(x['submission'], d): x['exitCode'] for x in r['results']}
+        self.assertEqual({'student-submission.py': 0, 'student-submission-bad.py': 1,
+                          'student-submission-tyerror.py': 1, 'group/main.py': 0}, results)
+
+    @unittest.skipIf(sys.version_info[:2] != (3, 12), 'subinterpreters need Python 3.12')
+    def test_batchSubinterpreters(self):
+        d = shell.mkTempDir(prefix='wypp-batch-tests')
+        for f in ['student-submission.py', 'student-submission-bad.py',
+                  'student-submission-tyerror.py']:
+            shell.cp(os.path.join('test-data', f), d)
+        report = os.path.join(d, 'report.json')
+        shell.run(f'python3 src/runYourProgram.py --batch {d} --batch-backend subinterpreter '
+                  f'--jobs 2 --report {report} '
+                  f'--test-file test-data/student-submission-tests.py {LOG_REDIR}')
+        with open(report) as f:
+            r = json.load(f)
+        results = {os.path.basename(x['submission']): x['exitCode'] for x in r['results']}
+        self.assertEqual({'student-submission.py': 0, 'student-submission-bad.py': 1,
+                          'student-submission-tyerror.py': 1}, results)
+        self.assertEqual(1, r['summary']['typeErrors'])
+
+    @unittest.skipIf(sys.version_info[:2] != (3, 12), 'subinterpreters need Python 3.12')
+    def test_batchSubinterpretersOutputLimit(self):
+        d = shell.mkTempDir(prefix='wypp-batch-tests')
+        shell.cp('test-data/student-submission.py', d)
+        with open(os.path.join(d, 'chatty.py'), 'w') as f:
+            f.write("for i in range(100):\n    print('x' * 100)\n")
+        report = os.path.join(d, 'report.json')
+        shell.run(f'python3 src/runYourProgram.py --batch {d} --batch-backend subinterpreter '
+                  f'--output-limit 1000 --report {report} {LOG_REDIR}')
+        with open(report) as f:
+            r = json.load(f)
+        results = {os.path.basename(x['submission']): x for x in r['results']}
+        self.assertEqual('output', results['chatty.py']['limitExceeded'])
+        self.assertEqual(124, results['chatty.py']['exitCode'])
+        self.assertEqual(1000, len(results['chatty.py']['output']))
+        self.assertEqual(0, results['student-submission.py']['exitCode'])
+
+    def test_batchCache(self):
+        d = shell.mkTempDir(prefix='wypp-batch-tests')
+        shell.cp('test-data/student-submission.py', d)
+        shell.cp('test-data/student-submission-bad.py', d)
+        cacheDir = shell.mkTempDir(prefix='wypp-cache-tests')
+        report = os.path.join(d, 'report.json')
+        def runBatch():
+            shell.run(f'python3 src/runYourProgram.py --batch {d} --cache {cacheDir} '
+                      f'--report {report} --test-file test-data/student-submission-tests.py '
+                      f'{LOG_REDIR}')
+            with open(report) as f:
+                return {os.path.basename(x['submission']): x for x in json.load(f)['results']}
+        r1 = runBatch()
+        self.assertFalse(any(x.get('cached') for x in r1.values()))
+        with open(os.path.join(d, 'student-submission-bad.py'), 'a') as f:
+            f.write('# changed\n')
+        r2 = runBatch()
+        self.assertTrue(r2['student-submission.py'].get('cached'))
+        self.assertFalse(r2['student-submission-bad.py'].get('cached'))
+        self.assertEqual(r1['student-submission.py']['output'],
+                         r2['student-submission.py']['output'])
+        self.assertEqual(1, r2['student-submission-bad.py']['exitCode'])
+
+    def test_batchLimits(self):
+        d = shell.mkTempDir(prefix='wypp-batch-tests')
+        shell.cp('test-data/student-submission.py', d)
+        shell.cp('test-data/testInfiniteLoop.py', d)
+        report = os.path.join(d, 'report.json')
+        shell.run(f'python3 src/runYourProgram.py --batch {d} --timeout 1 --report {report} '
+                  f'--test-file test-data/student-submission-tests.py {LOG_REDIR}')
+        with open(report) as f:
+            r = json.load(f)
+        self.assertEqual(1, r['summary']['limitExceeded'])
+        results = {os.path.basename(x['submission']): x for x in r['results']}
+        self.assertEqual('time', results['testInfiniteLoop.py']['limitExceeded'])
+        self.assertEqual(124, results['testInfiniteLoop.py']['exitCode'])
+        self.assertEqual(0, results['student-submission.py']['exitCode'])
+
+class LimitTests(unittest.TestCase):
+    def test_timeout(self):
+        res = runWithFlags('test-data/testInfiniteLoop.py', ['--quiet', '--timeout', '1'],
+                           onError='ignore')
+        self.assertEqual(124, res.exitcode)
+        self.assertIn('Limit exceeded: time limit of 1.0 seconds exceeded', res.stdout)
+
+    def test_timeoutInteractive(self):
+        res = runWithFlags('test-data/testCheck.py', ['--quiet', '--interactive', '--timeout', '1'],
+                           onError='ignore')
+        self.assertEqual(1, res.exitcode)
+        self.assertIn('ERROR: --timeout is not supported with --interactive', res.stdout)
+
+    def test_timeoutFlushesCheckFailures(self):
+        res = runWithFlags('test-data/testInfiniteLoopCheck.py', ['--quiet', '--timeout', '1'],
+                           onError='ignore')
+        self.assertEqual(124, res.exitcode)
+        self.assertIn('FEHLER in test-data/testInfiniteLoopCheck.py:3: Erwartet wird 2, aber das ' +
+                      'Ergebnis ist 1', res.stdout)
+        self.assertIn('Limit exceeded: time limit of 1.0 seconds exceeded', res.stdout)
+
+    def test_outputLimit(self):
+        res = runWithFlags('test-data/testCheck.py', ['--quiet', '--output-limit', '10'],
+                           onError='ignore')
+        self.assertEqual(124, res.exitcode)
+        self.assertIn('Limit exceeded: output limit of 10 bytes exceeded', res.stdout)
+
+    def test_outputLimitNonAscii(self):
+        d = shell.mkTempDir(prefix='wypp-limit-tests')
+        f = os.path.join(d, 'umlauts.py')
+        with open(f, 'w', encoding='utf-8') as h:
+            h.write("print('äöü' * 10)\n")
+        res = runWithFlags(f, ['--quiet', '--output-limit', '5'], onError='ignore')
+        self.assertEqual(124, res.exitcode)
+        # 5 bytes are two umlauts and half of the third one
+        self.assertTrue(res.stdout.startswith('äö\nLimit exceeded'), res.stdout)
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'server needs fork')
+class ServerTests(unittest.TestCase):
+    def test_server(self):
+        d = shell.mkTempDir(prefix='wypp-server-tests')
+        sock = os.path.join(d, 'wypp.sock')
+        testFile = 'test-data/student-submission-tests.py'
+        server = subprocess.Popen(['python3', 'src/runYourProgram.py', '--server', sock,
+                                   '--test-file', testFile],
+                                  env=dict(os.environ, PYTHONPATH='./site-lib'),
+                                  stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                if os.path.exists(sock):
+                    break
+                time.sleep(0.1)
+            flags = ['--connect', sock, '--check', '--test-file', testFile]
+            res = runWithFlags('test-data/student-submission.py', flags, onError='ignore')
+            self.assertEqual(0, res.exitcode)
+            self.assertIn('Tutor:  1 Tests, alle erfolgreich', res.stdout)
+            res = runWithFlags('test-data/student-submission-bad.py', flags, onError='ignore')
+            self.assertEqual(1, res.exitcode)
+            self.assertIn('Tutor:  1 Tests, 1 Fehler', res.stdout)
+        finally:
+            server.terminate()
+            server.wait()
+
 class InteractiveTests(unittest.TestCase):
 
     def test_scopeBugPeter(self):
@@ -180,6 +364,24 @@ caused by: <console>:1"""
         out = run('test-data/testTypes3.py', tycheck=False)
         self.assertEqual('END', out)
 
+    def test_typesInImportedModuleTransformJobs(self):
+        res = runWithFlags('test-data/testTransformJobs.py', ['--quiet', '--transform-jobs', '2'],
+                           onError='ignore')
+        self.assertEqual(1, res.exitcode)
+        self.assertIn('localMod', res.stdout)
+        self.assertIn('expected: value of type int', res.stdout)
+
+    def test_inlineChecksTraceback(self):
+        path = 'test-data/testInlineChecksTraceback.py'
+        flags = ['--interactive', '--quiet', '--no-clear', '--inline-checks']
+        # The frame of a one-line function is kept for errors in its result
+        res = runWithFlags(path, flags, input='show(2)', onError='raise')
+        self.assertIn(f'File "{path}", line 2, in show', res.stdout)
+        # but not for errors in its arguments, the caller is responsible
+        res = runWithFlags(path, flags, input='inc("1")', onError='raise')
+        self.assertIn('File "<console>", line 1, in <module>\nWyppTypeError', res.stdout)
+        self.assertNotIn('in inc', res.stdout)
+
 class ReplTesterTests(unittest.TestCase):
 
     def test_replTester(self):
@@ -187,3 +389,21 @@ class ReplTesterTests(unittest.TestCase):
         cmd = f'python3 {d}/src/replTester.py {d}/test-data/repl-test-lib.py --repl {d}/test-data/repl-test-checks.py'
         res = shell.run(cmd, captureStdout=True, onError='die', cwd='/tmp')
         self.assertIn('All 1 tests succeded. Great!', res.stdout)
+
+class BundleTests(unittest.TestCase):
+
+    def test_bundle(self):
+        d = shell.mkTempDir(prefix='wypp-bundle-tests')
+        bundle = os.path.join(d, 'wypp.zip')
+        shell.run(f'python3 src/runYourProgram.py --build-bundle {bundle} {LOG_REDIR}')
+        self.assertTrue(os.path.isfile(bundle))
+        installDir = os.path.join(d, 'site-packages')
+        res = shell.run(f'python3 src/runYourProgram.py --bundle {bundle} --verbose --quiet '
+                        '--install-mode install test-data/testTypes3.py',
+                        captureStdout=True, stderrToStdout=True, onError='ignore',
+                        env={'PYTHONPATH': '', 'WYPP_INSTALL_DIR': installDir})
+        self.assertEqual(1, res.exitcode)
+        self.assertIn(f'Importing wypp and untypy from bundle {bundle}', res.stdout)
+        self.assertIn('skipping installation of the WYPP library', res.stdout)
+        self.assertIn('expected: value of type int', res.stdout)
+        self.assertFalse(os.path.exists(installDir))
@@ -21,6 +21,7 @@ intNegative = w.intNegative
 intNonNegative = w.intNonNegative
 intNonPositive = w.intNonPositive
 intPositive = w.intPositive
+loadRecords = w.loadRecords
 math = w.math
 nat = w.nat
 record = w.record
@@ -50,6 +51,7 @@ __all__ = [
     'intNonNegative',
     'intNonPositive',
     'intPositive',
+    'loadRecords',
     'math',
     'nat',
     'record',
@@ -60,6 +62,11 @@ __all__ = [
 ]
 
 # Exported names not available for star imports (in alphabetic order)
+addTestCount = w.addTestCount
+flushCheckFailures = w.flushCheckFailures
+getTestCount = w.getTestCount
 initModule = w.initModule
 printTestResults = w.printTestResults
 resetTestCount = w.resetTestCount
+setBufferCheckFailures = w.setBufferCheckFailures
+setTestEventStream = w.setTestEventStream
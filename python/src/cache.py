@@ -0,0 +1,154 @@
+# Caches for grading runs.
+#
+# The code cache stores the transformed and compiled code of the tutor's test files on
+# disk, in the directory of --cache or $WYPP_CACHE_DIR. Without either, nothing is written.
+# One-shot runs then only have to execute the code. Inside one process, runner.getCode
+# keeps the code objects in memory.
+#
+# The result cache stores the result record of a graded submission under a key derived
+# from the contents of everything the result depends on: the submission and the local
+# modules it imports, the tutor's test file, the sources of wypp and untypy, the Python
+# version and the options of the run. Unchanged submissions are then not executed again.
+import sys
+import os
+import os.path
+import json
+import hashlib
+import marshal
+
+if __package__:
+    from . import runner
+else:
+    import runner
+
+# Increment if the format of cached data changes
+CACHE_FORMAT = 1
+
+_codeCacheDir = None
+
+def setCodeCacheDir(d):
+    global _codeCacheDir
+    _codeCacheDir = d
+
+def codeCacheDir():
+    """The directory of the code cache, None if the code cache is disabled."""
+    return _codeCacheDir or os.getenv('WYPP_CACHE_DIR') or None
+
+def hashFile(h, path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    h.update(f'{len(data)}:'.encode('utf-8'))
+    h.update(data)
+
+_libraryDigest = None
+
+def libraryDigest():
+    """Digest of the version and the sources of wypp, untypy and the runner."""
+    global _libraryDigest
+    if _libraryDigest is None:
+        from pathlib import Path
+        h = hashlib.sha256()
+        h.update(str(runner.readVersion()).encode('utf-8'))
+        files = [(str(p), p.name) for p in sorted(Path(runner.LIB_DIR).glob('*.py'))]
+        files += list(runner.bundleFiles())
+        for (path, name) in files:
+            h.update(name.encode('utf-8'))
+            hashFile(h, path)
+        _libraryDigest = h.hexdigest()
+    return _libraryDigest
+
+_libraryFingerprint = None
+
+def libraryFingerprint():
+    """Like libraryDigest, but from the sizes and modification times of the files, so
+    that it is cheap enough for every run."""
+    global _libraryFingerprint
+    if _libraryFingerprint is None:
+        from pathlib import Path
+        files = [str(p) for p in sorted(Path(runner.LIB_DIR).glob('*.py'))]
+        files += [path for (path, _name) in runner.bundleFiles()]
+        stats = []
+        for path in files:
+            st = os.stat(path)
+            stats.append((path, st.st_size, st.st_mtime_ns))
+        _libraryFingerprint = hashlib.sha256(json.dumps(stats).encode('utf-8')).hexdigest()
+    return _libraryFingerprint
+
+def codePath(codeTxt, fileToRun, useUntypy):
+    h = hashlib.sha256()
+    # The file name is part of the code object
+    inlineChecks = False
+    if useUntypy:
+        # Inline checks change the transformed code
+        import untypy
+        inlineChecks = untypy.inline_checks_enabled()
+    h.update(json.dumps([CACHE_FORMAT, sys.version, libraryFingerprint(), fileToRun,
+                         useUntypy, inlineChecks]).encode('utf-8'))
+    h.update(codeTxt.encode('utf-8', 'surrogatepass'))
+    key = h.hexdigest()
+    return os.path.join(codeCacheDir(), 'code', key[:2], key + '.bin')
+
+def loadCode(codeTxt, fileToRun, useUntypy):
+    """Returns the cached code object for codeTxt or None."""
+    if codeCacheDir() is None:
+        return None
+    try:
+        with open(codePath(codeTxt, fileToRun, useUntypy), 'rb') as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+def storeCode(codeTxt, fileToRun, useUntypy, code):
+    if codeCacheDir() is None:
+        return
+    p = codePath(codeTxt, fileToRun, useUntypy)
+    tmp = f'{p}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            marshal.dump(code, f)
+        os.replace(tmp, p)
+    except OSError as e:
+        # The cache is optional
+        runner.verbose(f'Cannot write code cache {p}: {e}')
+
+def sourceDigest(file):
+    """Digest of file and the local modules it imports. Paths do not matter, so
+    a submission moved to another directory has the same digest."""
+    h = hashlib.sha256()
+    hashFile(h, file)
+    localDir = os.path.dirname(os.path.abspath(file))
+    for (name, path) in sorted(runner.findImportedModuleFiles([localDir], file)):
+        h.update(name.encode('utf-8'))
+        hashFile(h, path)
+    return h.hexdigest()
+
+def resultKey(file, testFile, options):
+    """The cache key for the result of grading file with the tutor's tests in testFile.
+    options must contain all other settings that influence the result."""
+    h = hashlib.sha256()
+    h.update(json.dumps([CACHE_FORMAT, sys.version, sys.platform, libraryDigest(),
+                         options]).encode('utf-8'))
+    h.update(sourceDigest(file).encode('utf-8'))
+    if testFile:
+        h.update(sourceDigest(testFile).encode('utf-8'))
+    return h.hexdigest()
+
+class ResultCache:
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+    def path(self, key):
+        return os.path.join(self.cacheDir, 'results', key[:2], key + '.json')
+    def get(self, key):
+        try:
+            with open(self.path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    def put(self, key, result):
+        p = self.path(key)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = f'{p}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp, p)
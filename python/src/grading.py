@@ -0,0 +1,454 @@
+# Batch grading: runs many submissions against the tutor's tests in a pool of worker
+# processes and aggregates the results into a report.
+#
+# Every submission runs in its own process, exactly like `runYourProgram.py --check`
+# would run it. The coordinating process only schedules the workers and collects the
+# result records they write.
+import sys
+import os
+import os.path
+import json
+import tempfile
+import types
+import multiprocessing
+import multiprocessing.connection
+
+if __package__:
+    from . import runner
+    from . import limits as lim
+else:
+    import runner
+    import limits as lim
+
+# Frames of this module are hidden in tracebacks, see runner.ignoreFrame
+__wypp_runYourProgram = 1
+
+# Columns of the report, in this order. The captured output of a submission is only
+# part of the JSON report.
+RESULT_FIELDS = ['submission', 'exitCode', 'studentTotal', 'studentFailing',
+                 'tutorTotal', 'tutorFailing', 'typeErrors', 'crashes', 'limitExceeded',
+                 'error']
+SUMMARY_FIELDS = ['submissions', 'passed', 'studentTotal', 'studentFailing',
+                  'tutorTotal', 'tutorFailing', 'typeErrors', 'crashes', 'limitExceeded']
+
+def findSubmissions(batchDir, mainFile=None):
+    """Returns the submissions in batchDir: every python file directly in batchDir and,
+    if mainFile is given, mainFile in every subdirectory of batchDir."""
+    res = []
+    for name in sorted(os.listdir(batchDir)):
+        p = os.path.join(batchDir, name)
+        if os.path.isfile(p) and name.endswith('.py'):
+            res.append(p)
+        elif mainFile and os.path.isdir(p):
+            f = os.path.join(p, mainFile)
+            if os.path.isfile(f):
+                res.append(f)
+    return res
+
+def newResult(submission):
+    return {'submission': submission, 'exitCode': None,
+            'studentTotal': 0, 'studentFailing': 0, 'tutorTotal': 0, 'tutorFailing': 0,
+            'typeErrors': 0, 'crashes': 0, 'limitExceeded': None, 'error': None, 'output': ''}
+
+def recordLimitExceeded(result, limits, what):
+    """Marks result as terminated because limit what ('time', 'memory' or 'output')
+    was exceeded."""
+    result['limitExceeded'] = what
+    result['exitCode'] = lim.LIMIT_EXCEEDED_EXIT_CODE
+    result['error'] = 'Limit exceeded: ' + limits.describe(what)
+
+def recordException(result, limits, exitCode=1):
+    """Records the exception currently being handled in result. The traceback is
+    printed as usual, so that it becomes part of the captured output."""
+    (_etype, val, _tb) = sys.exc_info()
+    if isinstance(val, SystemExit):
+        code = val.code
+        if code is None:
+            code = 0
+        elif not isinstance(code, int):
+            code = 1
+        result['exitCode'] = code
+        result['error'] = f'exit({val.code!r})'
+        return
+    if isinstance(val, lim.OutputLimitExceeded):
+        recordLimitExceeded(result, limits, 'output')
+        return
+    runner.handleCurrentException(exit=False)
+    if isinstance(val, MemoryError):
+        recordLimitExceeded(result, limits, 'memory')
+        return
+    untypy = runner.untypy
+    if isinstance(val, untypy.error.UntypyTypeError):
+        result['typeErrors'] += 1
+    else:
+        result['crashes'] += 1
+    if isinstance(val, untypy.error.UntypyError):
+        name = 'Wypp' + val.simpleName()
+    else:
+        name = type(val).__name__
+    msg = str(val).strip().split('\n')[0]
+    result['error'] = f'{name}: {msg}' if msg else name
+    result['exitCode'] = exitCode
+
+def gradeSubmission(file, testFile, useUntypy=True, limits=lim.Limits(), testJobs=None):
+    """Runs file and then the tutor's tests in testFile, like main does with --check.
+    Must be called in a fresh process. Returns the result record of the submission."""
+    result = newResult(file)
+    libDefs = runner.prepareLib(onlyCheckRunnable=False)
+    mod = types.ModuleType('__wypp__')
+    sys.modules['__wypp__'] = mod
+    globals = mod.__dict__
+    globals['__file__'] = file
+    try:
+        runner.runStudentCode(file, globals, False, [], useUntypy=useUntypy)
+    except BaseException:
+        recordException(result, limits)
+        return result
+    testResults = libDefs.printTestResults('Student: ' if testFile else '')
+    result['studentTotal'] = testResults['total']
+    result['studentFailing'] = testResults['failing']
+    if testFile:
+        try:
+            testResults = runner.runTestsInFile(testFile, globals, libDefs,
+                                                useUntypy=useUntypy, exitOnError=False,
+                                                testJobs=testJobs)
+        except BaseException:
+            recordException(result, limits)
+            return result
+        result['tutorTotal'] = testResults['total']
+        result['tutorFailing'] = testResults['failing']
+    failingSum = result['studentFailing'] + result['tutorFailing']
+    result['exitCode'] = 0 if failingSum < 1 else 1
+    return result
+
+def runWorker(file, testFile, useUntypy, limits, testJobs, resultFile, outputFile):
+    """Entry point of a worker process. Output of the submission goes to outputFile,
+    the result record to resultFile. The wall-clock limit is enforced by gradeAll."""
+    out = os.open(outputFile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.dup2(out, 1)
+    os.dup2(out, 2)
+    os.close(out)
+    sys.stdin = open(os.devnull)
+    os.chdir(os.path.dirname(file))
+    runner.importUntypy()
+    if testFile:
+        # The limit on the file size would also apply to writes to the code cache
+        runner.preloadCode(testFile, useUntypy)
+    lim.setResourceLimits(limits, outputIsFile=True)
+    try:
+        result = gradeSubmission(file, testFile, useUntypy, limits, testJobs)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    lim.liftOutputLimit()
+    with open(resultFile, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+def readOutput(outputFile, limits):
+    with open(outputFile, 'rb') as f:
+        data = f.read(limits.output + 1 if limits.output else -1)
+    truncated = limits.output and len(data) > limits.output
+    if truncated:
+        data = data[:limits.output]
+    s = data.decode('utf-8', 'replace')
+    if truncated:
+        s += '\n[output truncated]\n'
+    return (s, truncated)
+
+def collectResult(file, proc, limits, timedOut, resultFile, outputFile):
+    try:
+        with open(resultFile, encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        result = newResult(file)
+        what = 'time' if timedOut else lim.limitFromExitCode(proc.exitcode)
+        if what:
+            recordLimitExceeded(result, limits, what)
+        else:
+            result['exitCode'] = proc.exitcode
+            result['crashes'] = 1
+            result['error'] = f'worker process died with exit code {proc.exitcode}'
+            result['workerFailed'] = True
+    try:
+        (result['output'], truncated) = readOutput(outputFile, limits)
+    except OSError:
+        truncated = False
+    if truncated and not result['limitExceeded']:
+        recordLimitExceeded(result, limits, 'output')
+    return result
+
+def gradeAll(submissions, testFile, jobs, useUntypy=True, limits=lim.Limits(), testJobs=None,
+             progress=None):
+    """Grades all submissions with at most jobs worker processes running at the
+    same time. Returns the result records in the order of submissions."""
+    import time
+    ctx = multiprocessing.get_context()
+    results = [None] * len(submissions)
+    pending = list(enumerate(submissions))
+    pending.reverse()
+    running = {}
+    with tempfile.TemporaryDirectory(prefix='wypp-batch') as tmpDir:
+        while pending or running:
+            while pending and len(running) < jobs:
+                (i, file) = pending.pop()
+                resultFile = os.path.join(tmpDir, f'{i}.json')
+                outputFile = os.path.join(tmpDir, f'{i}.out')
+                proc = ctx.Process(target=runWorker,
+                                   args=(file, testFile, useUntypy, limits, testJobs,
+                                         resultFile, outputFile))
+                proc.start()
+                deadline = time.monotonic() + limits.timeout if limits.timeout else None
+                running[proc.sentinel] = (i, file, proc, deadline, resultFile, outputFile)
+            timeout = None
+            deadlines = [x[3] for x in running.values() if x[3] is not None]
+            if deadlines:
+                timeout = max(0, min(deadlines) - time.monotonic())
+            ready = multiprocessing.connection.wait(list(running), timeout)
+            now = time.monotonic()
+            killed = set()
+            for (sentinel, (_i, _file, proc, deadline, _r, _o)) in running.items():
+                if sentinel not in ready and deadline is not None and deadline <= now:
+                    # Watchdog: kill runs that exceed the wall-clock limit
+                    proc.kill()
+                    killed.add(sentinel)
+            for sentinel in list(ready) + list(killed):
+                (i, file, proc, _deadline, resultFile, outputFile) = running.pop(sentinel)
+                proc.join()
+                timedOut = sentinel in killed
+                results[i] = collectResult(file, proc, limits, timedOut, resultFile, outputFile)
+                if progress:
+                    progress(results[i])
+    return results
+
+# Backend running every submission in a fresh subinterpreter of the current process
+# (Python 3.12). Each subinterpreter has its own GIL, its own sys.modules and thus its
+# own copy of wypp and untypy.
+#
+# This backend provides no isolation: student code shares the process with the grader.
+# os._exit terminates the grader, os.chdir, sys.setrecursionlimit and writes to file
+# descriptors affect all submissions, and only the output limit can be enforced.
+
+# Python versions the backend has been tested with
+SUBINTERPRETER_VERSIONS = [(3, 12)]
+
+SUBINTERPRETER_SCRIPT = '''
+import sys
+import io
+sys.stdout = sys.stderr = io.StringIO()
+sys.stdin = io.StringIO()
+sys.path[:0] = {path!r}
+import {module} as grading
+grading.runInSubinterpreter({file!r}, {testFile!r}, {useUntypy!r}, {channel!r},
+                            {hasTestCode!r}, {outputLimit!r}, {testFunctions!r})
+'''
+
+def subinterpreterModules():
+    """Returns the modules for subinterpreters and channels, or None if this Python
+    version does not support subinterpreters with their own GIL."""
+    try:
+        # Python 3.13+
+        import _interpreters as interps
+        import _interpchannels as chans
+    except ImportError:
+        try:
+            import _xxsubinterpreters as interps
+            import _xxinterpchannels as chans
+        except ImportError:
+            return None
+    if sys.version_info[:2] not in SUBINTERPRETER_VERSIONS:
+        return None
+    return (interps, chans)
+
+def sendNowait(chans, cid, obj):
+    # Since Python 3.13, send blocks until the item has been received
+    if sys.version_info >= (3, 13):
+        chans.send(cid, obj, blocking=False)
+    else:
+        chans.send(cid, obj)
+
+def createIsolatedInterpreter(interps):
+    try:
+        return interps.create(isolated=True)
+    except TypeError:
+        return interps.create('isolated')
+
+def runInSubinterpreter(file, testFile, useUntypy, channel, hasTestCode, outputLimit=None,
+                        testFunctions=False):
+    """Entry point in a subinterpreter, sends the result record over channel. With
+    hasTestCode, the marshalled code of testFile is the first item in channel. With
+    testFunctions, the test functions of testFile are called one after another."""
+    (_interps, chans) = subinterpreterModules()
+    output = sys.stdout
+    limits = lim.Limits(output=outputLimit)
+    if outputLimit:
+        # Exiting would terminate the grader, see LimitedOutput
+        counter = [0]
+        sys.stdout = lim.LimitedOutput(output, limits, counter, exit=False)
+        sys.stderr = lim.LimitedOutput(output, limits, counter, exit=False)
+    runner.importUntypy()
+    if hasTestCode:
+        import marshal
+        runner.addCachedCode(testFile, useUntypy, marshal.loads(chans.recv(channel)))
+    try:
+        result = gradeSubmission(file, testFile, useUntypy, limits,
+                                 testJobs=1 if testFunctions else None)
+    except BaseException:
+        result = newResult(file)
+        recordException(result, limits)
+    result['output'] = output.getvalue()
+    sendNowait(chans, channel, json.dumps(result))
+
+def gradeInSubinterpreter(file, testFile, useUntypy, testCode=None, outputLimit=None,
+                          testFunctions=False):
+    (interps, chans) = subinterpreterModules()
+    iid = createIsolatedInterpreter(interps)
+    cid = chans.create()
+    try:
+        if testCode is not None:
+            sendNowait(chans, cid, testCode)
+        script = SUBINTERPRETER_SCRIPT.format(path=sys.path, module=__name__, file=file,
+                                              testFile=testFile, useUntypy=useUntypy,
+                                              channel=int(cid),
+                                              hasTestCode=testCode is not None,
+                                              outputLimit=outputLimit,
+                                              testFunctions=testFunctions)
+        try:
+            failure = interps.run_string(iid, script)
+        except Exception as e:
+            failure = e
+        data = chans.recv(cid, None)
+        if data is not None:
+            return json.loads(data)
+        result = newResult(file)
+        result['exitCode'] = 1
+        result['crashes'] = 1
+        result['error'] = f'subinterpreter failed: {failure}'
+        result['workerFailed'] = True
+        return result
+    finally:
+        chans.destroy(cid)
+        interps.destroy(iid)
+
+def gradeAllInSubinterpreters(submissions, testFile, jobs, useUntypy=True, limits=lim.Limits(),
+                              testFunctions=False, progress=None):
+    """Like gradeAll, but with at most jobs subinterpreters running at the same time.
+    Only the output limit of limits is enforced."""
+    from concurrent.futures import ThreadPoolExecutor
+    import marshal
+    # Code objects cannot be shared between interpreters, but their marshalled form can.
+    # The subinterpreters then only have to execute the tutor's tests.
+    testCode = None
+    if testFile:
+        testCode = marshal.dumps(runner.preloadCode(testFile, useUntypy))
+    def grade(file):
+        result = gradeInSubinterpreter(file, testFile, useUntypy, testCode, limits.output,
+                                       testFunctions)
+        if progress:
+            progress(result)
+        return result
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(grade, submissions))
+
+# Results that depend on the load of the machine or on failures of the grading
+# infrastructure are not cached.
+def isCacheable(result):
+    return result['limitExceeded'] != 'time' and not result.get('workerFailed')
+
+def summarize(results):
+    summary = {k: 0 for k in SUMMARY_FIELDS}
+    summary['submissions'] = len(results)
+    for r in results:
+        if r['exitCode'] == 0:
+            summary['passed'] += 1
+        for k in SUMMARY_FIELDS[2:-1]:
+            summary[k] += r[k]
+        if r['limitExceeded']:
+            summary['limitExceeded'] += 1
+    return summary
+
+def writeReport(reportFile, summary, results):
+    """Writes the report as CSV if reportFile ends with .csv, otherwise as JSON.
+    Without reportFile, the JSON report goes to stdout."""
+    if reportFile and reportFile.endswith('.csv'):
+        import csv
+        with open(reportFile, 'w', newline='', encoding='utf-8') as f:
+            w = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+            w.writeheader()
+            w.writerows(results)
+        return
+    report = {'summary': summary, 'results': results}
+    if reportFile:
+        with open(reportFile, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+def runBatch(args):
+    batchDir = args.batch
+    if not os.path.isdir(batchDir):
+        runner.printStderr(f'ERROR: {batchDir} is not a directory')
+        runner.die(1)
+    submissions = [os.path.abspath(f) for f in findSubmissions(batchDir, args.file)]
+    testFile = os.path.abspath(args.testFile) if args.testFile else None
+    jobs = max(1, args.jobs)
+    limits = lim.fromArgs(args)
+    def progress(r):
+        runner.verbose(f'{r["submission"]}: exit code {r["exitCode"]}')
+    allSubmissions = submissions
+    if args.cacheDir:
+        if __package__:
+            from . import cache
+        else:
+            import cache
+        resultCache = cache.ResultCache(args.cacheDir)
+        options = {'useUntypy': args.checkTypes, 'backend': args.batchBackend,
+                   'timeout': limits.timeout, 'memory': limits.memory, 'output': limits.output,
+                   'testFunctions': args.testJobs is not None}
+        keys = {f: cache.resultKey(f, testFile, options) for f in submissions}
+        cachedResults = {}
+        for f in submissions:
+            r = resultCache.get(keys[f])
+            if r is not None:
+                r['submission'] = f
+                r['cached'] = True
+                cachedResults[f] = r
+        submissions = [f for f in submissions if f not in cachedResults]
+        runner.verbose(f'{len(cachedResults)} results found in cache {args.cacheDir}')
+    if args.batchBackend == 'subinterpreter':
+        if subinterpreterModules() is None:
+            versions = ', '.join(f'{major}.{minor}' for (major, minor) in SUBINTERPRETER_VERSIONS)
+            runner.printStderr(f'ERROR: subinterpreters are only supported with Python {versions}')
+            runner.die(1)
+        if limits.timeout or limits.memory:
+            runner.printStderr('ERROR: time and memory limits are not supported with subinterpreters')
+            runner.die(1)
+        runner.verbose(f'grading {len(submissions)} submissions with {jobs} subinterpreters')
+        results = gradeAllInSubinterpreters(submissions, testFile, jobs,
+                                            useUntypy=args.checkTypes, limits=limits,
+                                            testFunctions=args.testJobs is not None,
+                                            progress=progress)
+    else:
+        # Import wypp and compile the tutor's tests once, so that forked worker processes
+        # do not have to.
+        runner.prepareLib(onlyCheckRunnable=False)
+        if testFile:
+            runner.preloadCode(testFile, args.checkTypes)
+        runner.verbose(f'grading {len(submissions)} submissions with {jobs} processes')
+        results = gradeAll(submissions, testFile, jobs, useUntypy=args.checkTypes,
+                           limits=limits, testJobs=args.testJobs, progress=progress)
+    if args.cacheDir:
+        for r in results:
+            if isCacheable(r):
+                resultCache.put(keys[r['submission']], r)
+        byFile = {r['submission']: r for r in results}
+        byFile.update(cachedResults)
+        results = [byFile[f] for f in allSubmissions]
+    summary = summarize(results)
+    writeReport(args.report, summary, results)
+    if not args.quiet:
+        runner.printStderr(f'Graded {summary["submissions"]} submissions, '
+                           f'{summary["passed"]} passed, {summary["typeErrors"]} type errors, '
+                           f'{summary["crashes"]} crashes, '
+                           f'{summary["limitExceeded"]} exceeded limits')
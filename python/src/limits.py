@@ -0,0 +1,152 @@
+# Limits for the time, memory and output of a run of student code. They protect
+# grading runs against infinite loops and runaway output.
+#
+# CPU time and memory are enforced with rlimits where the resource module is available.
+# Wall-clock time is enforced by a watchdog: a timer thread in a single run and the
+# coordinating process in batch mode.
+import sys
+import os
+
+# Same exit code as the timeout command of coreutils
+LIMIT_EXCEEDED_EXIT_CODE = 124
+
+class Limits:
+    def __init__(self, timeout=None, memory=None, output=None):
+        self.timeout = timeout # seconds of wall-clock and CPU time
+        self.memory = memory   # bytes of address space
+        self.output = output   # bytes written to stdout and stderr
+    def __bool__(self):
+        return bool(self.timeout or self.memory or self.output)
+    def describe(self, what):
+        if what == 'time':
+            return f'time limit of {self.timeout} seconds exceeded'
+        elif what == 'memory':
+            mb = self.memory // (1024 * 1024) if self.memory else '?'
+            return f'memory limit of {mb} MB exceeded'
+        elif what == 'output':
+            return f'output limit of {self.output} bytes exceeded'
+        return f'{what} limit exceeded'
+
+def fromArgs(args):
+    memory = args.memoryLimit * 1024 * 1024 if args.memoryLimit else None
+    return Limits(timeout=args.timeout, memory=memory, output=args.outputLimit)
+
+def setResourceLimits(limits, outputIsFile=False):
+    """Sets rlimits for CPU time and address space of the current process. With outputIsFile,
+    the output limit becomes a limit on the file size. Returns False if rlimits are not
+    supported."""
+    try:
+        import resource
+    except ImportError:
+        return False
+    if limits.timeout:
+        cpu = int(limits.timeout + 0.999)
+        # SIGXCPU at the soft limit, SIGKILL at the hard limit
+        setLimit(resource, resource.RLIMIT_CPU, cpu, cpu + 1)
+    if limits.memory:
+        setLimit(resource, resource.RLIMIT_AS, limits.memory, limits.memory)
+    if limits.output and outputIsFile:
+        # Only the soft limit, so that it can be lifted again, see liftOutputLimit.
+        setLimit(resource, resource.RLIMIT_FSIZE, limits.output, None)
+        # Python ignores SIGXFSZ, writes would fail with an exception that student code
+        # could catch. Terminate instead.
+        import signal
+        signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+    return True
+
+def setLimit(resource, which, soft, hard):
+    (_oldSoft, oldHard) = resource.getrlimit(which)
+    if hard is None or (oldHard != resource.RLIM_INFINITY and hard > oldHard):
+        hard = oldHard
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(which, (soft, hard))
+
+def liftOutputLimit():
+    try:
+        import resource
+    except ImportError:
+        return
+    (_soft, hard) = resource.getrlimit(resource.RLIMIT_FSIZE)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (hard, hard))
+
+def exitLimitExceeded(limits, what):
+    os.write(2, f'\nLimit exceeded: {limits.describe(what)}\n'.encode('utf-8'))
+    os._exit(LIMIT_EXCEEDED_EXIT_CODE)
+
+def flushAndExitLimitExceeded(limits, what, flushHook=None):
+    # Called from the watchdog thread. The main thread might hold the lock of stdout
+    # forever, so flushing must not block the exit. flushHook writes output that is
+    # still buffered, such as the failing checks.
+    import threading
+    def flush():
+        try:
+            if flushHook is not None:
+                flushHook()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+    t = threading.Thread(target=flush, daemon=True)
+    t.start()
+    t.join(0.5)
+    exitLimitExceeded(limits, what)
+
+class OutputLimitExceeded(BaseException):
+    """Raised by LimitedOutput if it must not terminate the process."""
+
+class LimitedOutput:
+    """Wraps sys.stdout or sys.stderr and terminates the process once all wrapped streams
+    together have written more than limits.output bytes. Without exit, the first write
+    beyond the limit raises OutputLimitExceeded instead and later writes are dropped."""
+    def __init__(self, stream, limits, counter, exit=True):
+        self._stream = stream
+        self._limits = limits
+        self._counter = counter
+        self._exit = exit
+    def write(self, s):
+        if self._counter[0] > self._limits.output:
+            return len(s)
+        data = s.encode('utf-8', 'replace')
+        n = len(data)
+        self._counter[0] += n
+        if self._counter[0] > self._limits.output:
+            # Cut the encoded output, a character cut in half is dropped
+            keep = max(0, n - (self._counter[0] - self._limits.output))
+            self._stream.write(data[:keep].decode('utf-8', 'ignore'))
+            self._stream.flush()
+            if self._exit:
+                exitLimitExceeded(self._limits, 'output')
+            raise OutputLimitExceeded()
+        return self._stream.write(s)
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def enforceLimits(limits, flushHook=None):
+    """Enforces limits for the rest of the current process. flushHook is called before the
+    process exits because of the time limit."""
+    setResourceLimits(limits)
+    if limits.timeout:
+        import signal
+        import threading
+        sigxcpu = getattr(signal, 'SIGXCPU', None)
+        if sigxcpu is not None:
+            signal.signal(sigxcpu, lambda _sig, _frame:
+                          flushAndExitLimitExceeded(limits, 'time', flushHook))
+        watchdog = threading.Timer(limits.timeout, flushAndExitLimitExceeded,
+                                   (limits, 'time', flushHook))
+        watchdog.daemon = True
+        watchdog.start()
+    if limits.output:
+        counter = [0]
+        sys.stdout = LimitedOutput(sys.stdout, limits, counter)
+        sys.stderr = LimitedOutput(sys.stderr, limits, counter)
+
+def limitFromExitCode(exitcode):
+    """Returns the limit that made a process with the given exit code terminate, if any."""
+    import signal
+    for (name, what) in [('SIGXCPU', 'time'), ('SIGXFSZ', 'output')]:
+        sig = getattr(signal, name, None)
+        if sig is not None and exitcode == -sig:
+            return what
+    return None
@@ -3,16 +3,11 @@ import sys
 import os
 import os.path
 import argparse
-import json
-import traceback
-import shutil
 import site
 import importlib
 import re
-import code
-import ast
-from modulefinder import ModuleFinder
-from pathlib import Path
+# Further modules (json, traceback, shutil, code, ast, modulefinder, pathlib) are imported
+# where they are needed. Startup time matters, most programs run only for a few milliseconds.
 
 __wypp_runYourProgram = 1
 
@@ -45,6 +40,8 @@ FILES_TO_INSTALL = ['writeYourProgram.py', 'drawingLib.py', '__init__.py']
 UNTYPY_DIR = os.path.join(LIB_DIR, "..", "deps", "untypy", "untypy")
 UNTYPY_MODULE_NAME = 'untypy'
 
+BUNDLE_ENV_VAR = 'WYPP_BUNDLE'
+
 def verbose(s):
     if VERBOSE or DEBUG:
         printStderr('[V] ' + s)
@@ -76,6 +73,12 @@ def parseCmdlineArgs(argList):
 - install         install the wypp library and continue even if installation fails
 - assertInstall   check whether wypp is installed
 """)
+    parser.add_argument('--bundle', dest='bundle', type=str,
+                        default=os.getenv(BUNDLE_ENV_VAR),
+                        help=f"""Import wypp and untypy from this zip archive (built with
+--build-bundle). Defaults to the value of ${BUNDLE_ENV_VAR}.""")
+    parser.add_argument('--build-bundle', dest='buildBundle', type=str,
+                        help='Build a zip archive with precompiled wypp and untypy modules and quit')
     parser.add_argument('--verbose', dest='verbose', action='store_const',
                         const=True, default=False,
                         help='Be verbose')
@@ -85,6 +88,9 @@ def parseCmdlineArgs(argList):
                         const=True, default=False, help='Do not clear the terminal')
     parser.add_argument('--test-file', dest='testFile',
                         type=str, help='Run additional tests contained in this file.')
+    parser.add_argument('--test-events', dest='testEvents', type=str, metavar='TARGET',
+                        help='Write an event for every check as JSON line to TARGET, a\n' +
+                        'file descriptor or a path')
     parser.add_argument('--change-directory', dest='changeDir', action='store_const',
                         const=True, default=False,
                         help='Change to the directory of FILE before running')
@@ -94,6 +100,56 @@ def parseCmdlineArgs(argList):
     parser.add_argument('--no-typechecking', dest='checkTypes', action='store_const',
                         const=False, default=True,
                         help='Do not check type annotations')
+    parser.add_argument('--inline-checks', dest='inlineChecks', action='store_const',
+                        const=True, default=False,
+                        help='Check the types of arguments and results inside the functions\n' +
+                        'instead of wrapping them, so that calls need no extra frame.\n' +
+                        'Not supported with --batch.')
+    parser.add_argument('--transform-jobs', dest='transformJobs', type=int, default=1,
+                        metavar='N',
+                        help='Transform the local modules imported by FILE for typechecking\n' +
+                        'with N processes in parallel (default: 1, transform on import)')
+    parser.add_argument('--test-jobs', dest='testJobs', type=int, metavar='N',
+                        help='Call the test functions (test_*) of the file given with\n' +
+                        '--test-file after loading it, in N forked processes in parallel.\n' +
+                        'Without this option, test functions are not called.')
+    parser.add_argument('--batch', dest='batch', type=str, metavar='DIR',
+                        help='Grade all submissions in DIR: every python file in DIR and FILE\n' +
+                        'in every subdirectory of DIR. Implies --check.')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        metavar='N',
+                        help='Grade N submissions in parallel (default: number of CPUs)')
+    parser.add_argument('--batch-backend', dest='batchBackend', type=str, default='process',
+                        choices=['process', 'subinterpreter'],
+                        help='Run every submission of --batch in a separate process (default)\n' +
+                        'or in a subinterpreter of the same process (Python 3.12). Subinterpreters\n' +
+                        'provide no isolation: all submissions share the process and the current\n' +
+                        'directory, and only --output-limit is supported.')
+    parser.add_argument('--cache', dest='cacheDir', type=str, metavar='DIR',
+                        help='Cache the results of --batch in DIR. Submissions are not run\n' +
+                        'again if neither they, the local modules they import, the test\n' +
+                        'file, wypp, the Python version nor the options have changed.\n' +
+                        'Also caches the compiled code of the test file in DIR, as does\n' +
+                        'the environment variable WYPP_CACHE_DIR.')
+    parser.add_argument('--report', dest='report', type=str,
+                        help='Write the report of --batch to this file, as CSV if the name\n' +
+                        'ends with .csv and as JSON otherwise (default: JSON on stdout)')
+    parser.add_argument('--timeout', dest='timeout', type=float, metavar='SECONDS',
+                        help='Abort with exit code 124 if running FILE and the tests takes\n' +
+                        'longer than SECONDS (wall-clock and CPU time). Not supported\n' +
+                        'with --interactive.')
+    parser.add_argument('--memory-limit', dest='memoryLimit', type=int, metavar='MB',
+                        help='Limit the address space of the process to MB megabytes')
+    parser.add_argument('--output-limit', dest='outputLimit', type=int, metavar='BYTES',
+                        help='Abort with exit code 124 if FILE and the tests write more than\n' +
+                        'BYTES bytes to stdout and stderr')
+    parser.add_argument('--server', dest='server', type=str, metavar='SOCKET',
+                        help='Start a server listening on the unix domain socket SOCKET. The\n' +
+                        'server preloads wypp, untypy and the file given with --test-file\n' +
+                        'and forks a new process for every request.')
+    parser.add_argument('--connect', dest='connect', type=str, metavar='SOCKET',
+                        help='Run in the server listening on SOCKET, or without server\n' +
+                        'if it is not reachable')
     parser.add_argument('file', metavar='FILE',
                         help='The file to run', nargs='?')
     if argList is None:
@@ -108,8 +164,25 @@ def parseCmdlineArgs(argList):
     if args.installMode not in InstallMode.allModes:
         printStderr(f'ERROR: invalid install mode {args.installMode}.')
         die()
+    if args.timeout and args.interactive:
+        # The time limit would end the REPL while the user is typing
+        printStderr('ERROR: --timeout is not supported with --interactive')
+        die()
     return (args, restArgs)
 
+# Removes `name VALUE` and `name=VALUE` from argList
+def removeArg(argList, name):
+    res = []
+    skip = False
+    for a in argList:
+        if skip:
+            skip = False
+        elif a == name:
+            skip = True
+        elif not a.startswith(name + '='):
+            res.append(a)
+    return res
+
 def readFile(path):
     try:
         with open(path, encoding='utf-8') as f:
@@ -119,6 +192,7 @@ def readFile(path):
             return f.read()
 
 def readVersion():
+    import json
     version = None
     try:
         content = readFile(os.path.join(LIB_DIR, '..', '..', 'package.json'))
@@ -146,6 +220,8 @@ def isSameFile(f1, f2):
     return x == y
 
 def installFromDir(srcDir, targetDir, mod, files=None):
+    import shutil
+    from pathlib import Path
     verbose(f'Installing from {srcDir} to {targetDir}/{mod}')
     if files is None:
         files = [p.relative_to(srcDir) for p in Path(srcDir).rglob('*.py')]
@@ -207,6 +283,42 @@ def installLib(mode):
         printStderr('Exiting after installation of the WYPP library')
         die(0)
 
+def bundleFiles():
+    from pathlib import Path
+    for f in FILES_TO_INSTALL:
+        yield (os.path.join(LIB_DIR, f), f'{INSTALLED_MODULE_NAME}/{f}')
+    for p in sorted(Path(UNTYPY_DIR).rglob('*.py')):
+        yield (str(p), f'{UNTYPY_MODULE_NAME}/{p.relative_to(UNTYPY_DIR).as_posix()}')
+
+# The bundle contains the sources and bytecode compiled by the current interpreter.
+# zipimport falls back to the sources if the bytecode was compiled by another python version.
+# We use unchecked hash-based pycs, so zipimport does not compare timestamps.
+def buildBundle(targetFile):
+    import py_compile
+    import tempfile
+    import zipfile
+    verbose(f'Building bundle {targetFile}')
+    targetFile = os.path.abspath(targetFile)
+    tmpFile = targetFile + '.tmp'
+    with tempfile.TemporaryDirectory() as d, \
+        zipfile.ZipFile(tmpFile, 'w', zipfile.ZIP_STORED) as z:
+        pycFile = os.path.join(d, 'module.pyc')
+        for (src, arcName) in bundleFiles():
+            z.write(src, arcName)
+            py_compile.compile(src, cfile=pycFile, dfile=os.path.join(targetFile, arcName),
+                               doraise=True,
+                               invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+            z.write(pycFile, arcName + 'c')
+    os.replace(tmpFile, targetFile)
+    printStderr(f'Bundle with the WYPP library written to {targetFile}')
+
+def useBundle(bundleFile):
+    if not os.path.isfile(bundleFile):
+        printStderr(f'ERROR: bundle {bundleFile} does not exist')
+        die(1)
+    verbose(f'Importing wypp and untypy from bundle {bundleFile}')
+    sys.path.insert(0, os.path.abspath(bundleFile))
+
 class Lib:
     def __init__(self, mod, properlyImported):
         self.properlyImported = properlyImported
@@ -214,11 +326,17 @@ class Lib:
             self.initModule = mod['initModule']
             self.resetTestCount = mod['resetTestCount']
             self.printTestResults = mod['printTestResults']
+            self.getTestCount = mod['getTestCount']
+            self.addTestCount = mod['addTestCount']
+            self.flushCheckFailures = mod['flushCheckFailures']
             self.dict = mod
         else:
             self.initModule = mod.initModule
             self.resetTestCount = mod.resetTestCount
             self.printTestResults = mod.printTestResults
+            self.getTestCount = mod.getTestCount
+            self.addTestCount = mod.addTestCount
+            self.flushCheckFailures = mod.flushCheckFailures
             d = {}
             self.dict = d
             for name in dir(mod):
@@ -250,7 +368,10 @@ def findWyppImport(fileName):
             return True
     return False
 
-def findImportedModules(path, file):
+# Returns pairs (name, file) for the modules imported by file that live in one of the
+# directories in path.
+def findImportedModuleFiles(path, file):
+    from modulefinder import ModuleFinder
     finder = ModuleFinder(path=path)
     try:
         finder.run_script(file)
@@ -267,9 +388,35 @@ def findImportedModules(path, file):
                     good = True
                     break
             if good:
-                res.append(name)
+                res.append((name, mod.__file__))
     return res
 
+def findImportedModules(path, file):
+    return [name for (name, _) in findImportedModuleFiles(path, file)]
+
+# Transforms and compiles the given modules for typechecking in a pool of processes.
+# The import hook of untypy then only has to execute the code objects.
+def precompileModules(files, jobs):
+    from concurrent.futures import ProcessPoolExecutor
+    verbose(f'transforming {len(files)} modules with {jobs} processes')
+    tasks = []
+    for f in files:
+        with open(f, 'rb') as h:
+            data = h.read()
+        tasks.append((f, data, untypy.reserve_return_traces(data)))
+    inlineChecks = untypy.inline_checks_enabled()
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = [executor.submit(untypy.precompile, *t, inlineChecks) for t in tasks]
+        for ((f, data, base), future) in zip(tasks, futures):
+            try:
+                (code, returnTraces) = future.result()
+            except Exception as e:
+                # For example a syntax error, it is reported when the module is imported.
+                verbose(f'transforming {f} failed: {e}')
+                continue
+            untypy.add_precompiled(f, data, code, returnTraces, base)
+    verbose(f'finished transforming {len(files)} modules')
+
 class RunSetup:
     def __init__(self, sysPath):
         self.sysPath = sysPath
@@ -283,26 +430,71 @@ class RunSetup:
             sys.path.remove(self.sysPath)
             self.sysPathInserted = False
 
-def runCode(fileToRun, globals, args, useUntypy=True):
+def compileCode(codeTxt, fileToRun, useUntypy=True):
+    flags = 0 | anns.compiler_flag
+    if useUntypy:
+        import ast
+        verbose(f"transforming {fileToRun} for typechecking")
+        tree = compile(codeTxt, fileToRun, 'exec', flags=(flags | ast.PyCF_ONLY_AST),
+                        dont_inherit=True, optimize=-1)
+        untypy.transform_tree(tree, fileToRun)
+        verbose(f'done with transformation of {fileToRun}')
+        code = tree
+    else:
+        code = codeTxt
+    return compile(code, fileToRun, 'exec', flags=flags, dont_inherit=True)
+
+# Code objects of the tutor's test files, so that they are transformed and compiled only
+# once per process (and before forking in server and batch mode).
+# Maps the result of cachedCodeKey to (source, code object).
+cachedCode = {}
+
+def cachedCodeKey(fileToRun, useUntypy):
+    # Inline checks change the transformed code
+    return (os.path.realpath(fileToRun), useUntypy, useUntypy and untypy.inline_checks_enabled())
+
+def preloadCode(fileToRun, useUntypy=True):
+    return getCode(readFile(fileToRun), fileToRun, useUntypy, useCache=True)
+
+def addCachedCode(fileToRun, useUntypy, code):
+    cachedCode[cachedCodeKey(fileToRun, useUntypy)] = (readFile(fileToRun), code)
+
+# With useCache, the code is cached in this process and, if enabled, on disk (see cache.py).
+def getCode(codeTxt, fileToRun, useUntypy=True, useCache=False):
+    if not useCache:
+        return compileCode(codeTxt, fileToRun, useUntypy)
+    key = cachedCodeKey(fileToRun, useUntypy)
+    (cachedTxt, code) = cachedCode.get(key, (None, None))
+    if cachedTxt == codeTxt and code.co_filename == fileToRun:
+        verbose(f'using cached code of {fileToRun}')
+        return code
+    codeCache = importSibling('cache')
+    code = codeCache.loadCode(codeTxt, fileToRun, useUntypy)
+    if code is None:
+        code = compileCode(codeTxt, fileToRun, useUntypy)
+        # Before Python 3.12, untypy numbers return statements per process (see
+        # untypy.util.return_traces), code containing them cannot be reused elsewhere.
+        if not useUntypy or 'return' not in codeTxt or not untypy.uses_ast_return_traces():
+            codeCache.storeCode(codeTxt, fileToRun, useUntypy, code)
+    else:
+        verbose(f'using code of {fileToRun} from disk cache')
+    cachedCode[key] = (codeTxt, code)
+    return code
+
+def runCode(fileToRun, globals, args, useUntypy=True, transformJobs=1, useCache=False):
     localDir = os.path.dirname(fileToRun)
 
     with RunSetup(localDir):
         codeTxt = readFile(fileToRun)
-        flags = 0 | anns.compiler_flag
         if useUntypy:
             verbose(f'finding modules imported by {fileToRun}')
-            importedMods = findImportedModules([localDir], fileToRun)
+            importedModFiles = findImportedModuleFiles([localDir], fileToRun)
+            importedMods = [name for (name, _) in importedModFiles]
             verbose('finished finding modules, now installing import hook on ' + repr(importedMods))
             untypy.just_install_hook(importedMods + ['__wypp__'])
-            verbose(f"transforming {fileToRun} for typechecking")
-            tree = compile(codeTxt, fileToRun, 'exec', flags=(flags | ast.PyCF_ONLY_AST),
-                            dont_inherit=True, optimize=-1)
-            untypy.transform_tree(tree, fileToRun)
-            verbose(f'done with transformation of {fileToRun}')
-            code = tree
-        else:
-            code = codeTxt
-        compiledCode = compile(code, fileToRun, 'exec', flags=flags, dont_inherit=True)
+            if transformJobs > 1 and len(importedModFiles) > 1:
+                precompileModules([f for (_, f) in importedModFiles], transformJobs)
+        compiledCode = getCode(codeTxt, fileToRun, useUntypy, useCache)
         oldArgs = sys.argv
         try:
             sys.argv = [fileToRun] + args
@@ -310,8 +502,9 @@ def runCode(fileToRun, globals, args, useUntypy=True):
         finally:
             sys.argv = oldArgs
 
-def runStudentCode(fileToRun, globals, onlyCheckRunnable, args, useUntypy=True):
-    doRun = lambda: runCode(fileToRun, globals, args, useUntypy=useUntypy)
+def runStudentCode(fileToRun, globals, onlyCheckRunnable, args, useUntypy=True, transformJobs=1):
+    doRun = lambda: runCode(fileToRun, globals, args, useUntypy=useUntypy,
+                            transformJobs=transformJobs)
     if onlyCheckRunnable:
         try:
             doRun()
@@ -323,18 +516,125 @@ def runStudentCode(fileToRun, globals, onlyCheckRunnable, args, useUntypy=True):
     doRun()
 
 # globals already contain libDefs
-def runTestsInFile(testFile, globals, libDefs, useUntypy=True):
+# With testJobs, the test functions of testFile are called after loading it (see
+# findTestFunctions).
+def runTestsInFile(testFile, globals, libDefs, useUntypy=True, exitOnError=True, testJobs=None):
     printStderr()
     printStderr(f"Running tutor's tests in {testFile}")
     libDefs.resetTestCount()
     try:
-        runCode(testFile, globals, [], useUntypy=useUntypy)
+        runCode(testFile, globals, [], useUntypy=useUntypy, useCache=True)
     except:
+        if not exitOnError:
+            raise
         handleCurrentException()
+    testFuns = findTestFunctions(globals, testFile) if testJobs is not None else []
+    if testFuns:
+        if testJobs > 1 and len(testFuns) > 1 and hasattr(os, 'fork'):
+            runTestFunctionsForked(testFuns, libDefs, testJobs)
+        else:
+            for (name, fun) in testFuns:
+                runTestFunction(name, fun, libDefs)
     return libDefs.dict['printTestResults']('Tutor:  ')
 
+# The tutor's test file may define test functions, named test_* and without required
+# parameters. With --test-jobs, they are called after the file has been loaded. Each test
+# function must be independent of the others, so that they can run in parallel.
+def findTestFunctions(globals, testFile):
+    import inspect
+    path = os.path.realpath(testFile)
+    res = []
+    for (name, fun) in list(globals.items()):
+        if not name.startswith('test_') or not callable(fun):
+            continue
+        code = getattr(inspect.unwrap(fun), '__code__', None)
+        if code is None or os.path.realpath(code.co_filename) != path:
+            continue
+        try:
+            params = inspect.signature(fun).parameters.values()
+        except (TypeError, ValueError):
+            continue
+        # Helpers with parameters are not test functions
+        if any(p.default is p.empty and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+               for p in params):
+            continue
+        res.append((name, fun))
+    return res
+
+# A crashing test function counts as failing test.
+def runTestFunction(name, fun, libDefs):
+    try:
+        fun()
+    except:
+        printStderr(f'Test function {name} crashed')
+        handleCurrentException(exit=False)
+        libDefs.addTestCount({'total': 1, 'failing': 1})
+
+# Runs every test function in a process forked from the current one, so the student's
+# code does not have to be loaded again. At most jobs processes run at the same time.
+# Output of the test functions and the test counts are collected in the order of testFuns.
+def runTestFunctionsForked(testFuns, libDefs, jobs):
+    import json
+    import select
+    import tempfile
+    verbose(f'running {len(testFuns)} test functions with {jobs} processes')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pending = list(enumerate(testFuns))
+    pending.reverse()
+    running = {} # read end of the pipe to the child -> (index, pid, data)
+    outputs = {}
+    counts = {}
+    while pending or running:
+        while pending and len(running) < jobs:
+            (i, (name, fun)) = pending.pop()
+            output = tempfile.TemporaryFile()
+            (r, w) = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                ecode = 1
+                try:
+                    os.close(r)
+                    os.dup2(output.fileno(), 1)
+                    os.dup2(output.fileno(), 2)
+                    libDefs.resetTestCount()
+                    runTestFunction(name, fun, libDefs)
+                    libDefs.flushCheckFailures()
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os.write(w, json.dumps(libDefs.getTestCount()).encode('utf-8'))
+                    ecode = 0
+                finally:
+                    os._exit(ecode)
+            os.close(w)
+            outputs[i] = output
+            running[r] = (i, pid, b'')
+        (ready, _, _) = select.select(list(running), [], [])
+        for r in ready:
+            (i, pid, data) = running[r]
+            chunk = os.read(r, 4096)
+            if chunk:
+                running[r] = (i, pid, data + chunk)
+                continue
+            del running[r]
+            os.close(r)
+            os.waitpid(pid, 0)
+            if data:
+                counts[i] = json.loads(data.decode('utf-8'))
+            else:
+                (name, _fun) = testFuns[i]
+                outputs[i].write(f'Test function {name} crashed\n'.encode('utf-8'))
+                counts[i] = {'total': 1, 'failing': 1}
+    for (i, _) in enumerate(testFuns):
+        output = outputs[i]
+        output.seek(0)
+        sys.stdout.write(output.read().decode('utf-8', 'replace'))
+        output.close()
+        libDefs.addTestCount(counts[i])
+    sys.stdout.flush()
+
 # globals already contain libDefs
-def performChecks(check, testFile, globals, libDefs, useUntypy=True):
+def performChecks(check, testFile, globals, libDefs, useUntypy=True, testJobs=None):
     prefix = ''
     if check and testFile:
         prefix = 'Student: '
@@ -342,7 +642,8 @@ def performChecks(check, testFile, globals, libDefs, useUntypy=True):
     if check:
         testResultsInstr = {'total': 0, 'failing': 0}
         if testFile:
-            testResultsInstr = runTestsInFile(testFile, globals, libDefs, useUntypy=useUntypy)
+            testResultsInstr = runTestsInFile(testFile, globals, libDefs, useUntypy=useUntypy,
+                                              testJobs=testJobs)
         failingSum = testResultsStudent['failing'] + testResultsInstr['failing']
         die(0 if failingSum < 1 else 1)
 
@@ -378,17 +679,35 @@ def ignoreFrame(frame):
         modName == 'wypp' or modName.startswith('wypp.')
 
 # Returns a StackSummary object
-def limitTraceback(tb):
-    frames = [(f, f.f_lineno) for f in tbToFrameList(tb) if not ignoreFrame(f)]
+def limitTraceback(tb, val=None):
+    import traceback
+    allFrames = tbToFrameList(tb)
+    frames = [(f, f.f_lineno) for f in allFrames if not ignoreFrame(f)]
+    if frames and isinstance(val, untypy.error.UntypyError):
+        i = allFrames.index(frames[-1][0])
+        if i + 1 < len(allFrames) and allFrames[i + 1].f_code is untypy._check_arguments.__code__:
+            # Inline checks of arguments run in the called function (see --inline-checks),
+            # but the caller is responsible, as for wrapped functions.
+            frames.pop()
     return traceback.StackSummary.extract(frames)
 
+# Failing checks reported before the exception should be printed before the traceback.
+def flushCheckFailures():
+    wypp = sys.modules.get(INSTALLED_MODULE_NAME)
+    flush = getattr(wypp, 'flushCheckFailures', None)
+    if flush is not None:
+        flush()
+        sys.stdout.flush()
+
 def handleCurrentException(exit=True, removeFirstTb=False, file=sys.stderr):
+    import traceback
     (etype, val, tb) = sys.exc_info()
     if isinstance(val, SystemExit):
         die(val.code)
     if tb and removeFirstTb:
         tb = tb.tb_next
-    stackSummary = limitTraceback(tb)
+    flushCheckFailures()
+    stackSummary = limitTraceback(tb, val)
     header = False
     for x in stackSummary.format():
         if not header:
@@ -421,6 +740,14 @@ def getHistoryFilePath():
     else:
         return None
 
+# runner is imported as top-level module by runYourProgram.py and as part of the
+# wypp package otherwise.
+def importSibling(name):
+    if __package__:
+        return importlib.import_module(f'{__package__}.{name}')
+    else:
+        return importlib.import_module(name)
+
 # We cannot import untypy at the top of the file because we might have to install it first.
 def importUntypy():
     global untypy
@@ -452,14 +779,46 @@ Python in version 3.9.2 or newer is required. You are still using version {vStr}
     if args.verbose:
         VERBOSE = True
 
-    installLib(args.installMode)
-    if site.USER_SITE not in sys.path:
-        if not site.ENABLE_USER_SITE:
-            printStderr(f"User site-packages disabled ({site.USER_SITE}. This might cause problems importing wypp or untypy.")
-        else:
-            verbose(f"Adding user site-package directory {site.USER_SITE} to sys.path")
-            sys.path.append(site.USER_SITE)
+    if args.connect:
+        if argList is None:
+            argList = sys.argv[1:]
+        ecode = importSibling('server').runClient(args.connect, removeArg(argList, '--connect'))
+        if ecode is not None:
+            die(ecode)
+
+    if args.buildBundle:
+        buildBundle(args.buildBundle)
+        die(0)
+    if args.bundle:
+        useBundle(args.bundle)
+
+    if args.bundle and args.installMode != InstallMode.installOnly:
+        # wypp and untypy are imported from the bundle, installing them or searching
+        # the user site-packages directory would only slow down the start.
+        verbose('Using the bundle, skipping installation of the WYPP library')
+    else:
+        installLib(args.installMode)
+        if site.USER_SITE not in sys.path:
+            if not site.ENABLE_USER_SITE:
+                printStderr(f"User site-packages disabled ({site.USER_SITE}. This might cause problems importing wypp or untypy.")
+            else:
+                verbose(f"Adding user site-package directory {site.USER_SITE} to sys.path")
+                sys.path.append(site.USER_SITE)
     importUntypy()
+    if args.inlineChecks:
+        if args.batch:
+            printStderr('ERROR: --inline-checks is not supported with --batch')
+            die(1)
+        untypy.enable_inline_checks()
+    if args.cacheDir:
+        importSibling('cache').setCodeCacheDir(args.cacheDir)
+
+    if args.batch:
+        importSibling('grading').runBatch(args)
+        die(0)
+    if args.server:
+        importSibling('server').serve(args, globals)
+        die(0)
 
     fileToRun = args.file
     if args.changeDir:
@@ -467,16 +826,22 @@ Python in version 3.9.2 or newer is required. You are still using version {vStr}
         fileToRun = os.path.basename(fileToRun)
 
     isInteractive = args.interactive
-    version = readVersion()
     if isInteractive:
         prepareInteractive(reset=not args.noClear)
 
     if fileToRun is None:
         return
     if not args.checkRunnable and not args.quiet:
-        printWelcomeString(fileToRun, version, useUntypy=args.checkTypes)
+        printWelcomeString(fileToRun, readVersion(), useUntypy=args.checkTypes)
 
     libDefs = prepareLib(onlyCheckRunnable=args.checkRunnable)
+    if args.testEvents:
+        target = args.testEvents
+        libDefs.dict['setTestEventStream'](int(target) if target.isdigit() else target)
+
+    if args.timeout or args.memoryLimit or args.outputLimit:
+        limits = importSibling('limits')
+        limits.enforceLimits(limits.fromArgs(args), flushHook=flushCheckFailures)
 
     globals['__name__'] = '__wypp__'
     sys.modules['__wypp__'] = sys.modules['__main__']
@@ -484,18 +849,22 @@ Python in version 3.9.2 or newer is required. You are still using version {vStr}
         verbose(f'running code in {fileToRun}')
         globals['__file__'] = fileToRun
         runStudentCode(fileToRun, globals, args.checkRunnable, restArgs,
-                       useUntypy=args.checkTypes)
+                       useUntypy=args.checkTypes, transformJobs=args.transformJobs)
     except Exception as e:
         verbose(e)
         handleCurrentException()
 
-    performChecks(args.check, args.testFile, globals, libDefs, useUntypy=args.checkTypes)
+    performChecks(args.check, args.testFile, globals, libDefs, useUntypy=args.checkTypes,
+                  testJobs=args.testJobs)
 
     if isInteractive:
+        # Report failing checks in the REPL immediately
+        libDefs.dict['setBufferCheckFailures'](False)
         enterInteractive(globals)
         if args.checkTypes:
-            consoleClass = TypecheckedInteractiveConsole
+            consoleClass = mkTypecheckedInteractiveConsole()
         else:
+            import code
             consoleClass = code.InteractiveConsole
         historyFile = getHistoryFilePath()
         try:
@@ -512,28 +881,36 @@ Python in version 3.9.2 or newer is required. You are still using version {vStr}
                 readline.set_history_length(HISTORY_SIZE)
                 readline.write_history_file(historyFile)
 
-class TypecheckedInteractiveConsole(code.InteractiveConsole):
-
-    def showtraceback(self) -> None:
-        handleCurrentException(exit=False, removeFirstTb=True, file=sys.stdout)
-
-    def runsource(self, source, filename="<input>", symbol="single"):
-        try:
-            code = self.compile(source, filename, symbol)
-        except (OverflowError, SyntaxError, ValueError):
-            self.showsyntaxerror(filename)
+# The class is created on demand because importing the code module is only
+# necessary in interactive mode.
+def mkTypecheckedInteractiveConsole():
+    import ast
+    import code
+    import traceback
+
+    class TypecheckedInteractiveConsole(code.InteractiveConsole):
+
+        def showtraceback(self) -> None:
+            handleCurrentException(exit=False, removeFirstTb=True, file=sys.stdout)
+
+        def runsource(self, source, filename="<input>", symbol="single"):
+            try:
+                code = self.compile(source, filename, symbol)
+            except (OverflowError, SyntaxError, ValueError):
+                self.showsyntaxerror(filename)
+                return False
+            if code is None:
+                return True
+            try:
+                tree = compile("\n".join(self.buffer), filename, symbol, flags=ast.PyCF_ONLY_AST, dont_inherit=True, optimize=-1)
+                untypy.transform_tree(tree, filename)
+                code = compile(tree, filename, symbol)
+            except Exception as e:
+                if hasattr(e, 'text') and e.text == "":
+                    pass
+                else:
+                    traceback.print_tb(e.__traceback__)
+            self.runcode(code)
             return False
-        if code is None:
-            return True
-        try:
-            import ast
-            tree = compile("\n".join(self.buffer), filename, symbol, flags=ast.PyCF_ONLY_AST, dont_inherit=True, optimize=-1)
-            untypy.transform_tree(tree, filename)
-            code = compile(tree, filename, symbol)
-        except Exception as e:
-            if hasattr(e, 'text') and e.text == "":
-                pass
-            else:
-                traceback.print_tb(e.__traceback__)
-        self.runcode(code)
-        return False
+
+    return TypecheckedInteractiveConsole
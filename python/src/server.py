@@ -0,0 +1,223 @@
+# A long-running server process for runYourProgram.py (Unix only).
+#
+# The server imports wypp, untypy and the modules the runner needs once and optionally
+# compiles the tutor's tests in advance. For every request, it forks a child that runs
+# the request with copy-on-write state, like a fresh runYourProgram.py process would.
+#
+# The client (runYourProgram.py --connect SOCKET ...) sends its command line arguments,
+# working directory and environment together with its stdin, stdout and stderr file
+# descriptors over a unix domain socket. The child uses these file descriptors
+# directly, so output reaches the client unchanged. The server reports the exit code of
+# the child back to the client.
+import sys
+import os
+import os.path
+import json
+import socket
+
+if __package__:
+    from . import runner
+else:
+    import runner
+
+# Modules the runner imports on demand
+PRELOAD_MODULES = ['ast', 'json', 'traceback', 'modulefinder', 'shutil', 'pathlib',
+                   'code', 'marshal', 'concurrent.futures']
+
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+def sendMessage(conn, msg, fds=None):
+    data = json.dumps(msg).encode('utf-8') + b'\n'
+    if fds:
+        socket.send_fds(conn, [data], fds)
+    else:
+        conn.sendall(data)
+
+def recvMessage(conn, numFds=0):
+    (data, fds, _flags, _addr) = socket.recv_fds(conn, MAX_MESSAGE_SIZE, numFds)
+    while data and not data.endswith(b'\n'):
+        more = conn.recv(MAX_MESSAGE_SIZE)
+        if not more:
+            break
+        data += more
+    if not data:
+        return (None, fds)
+    return (json.loads(data.decode('utf-8')), fds)
+
+def exitCodeFromStatus(status):
+    code = os.waitstatus_to_exitcode(status)
+    # Like a shell: 128 + n for processes terminated by signal n
+    return 128 - code if code < 0 else code
+
+def runClient(socketPath, argList):
+    """Runs argList in the server listening on socketPath. Returns the exit code or
+    None if no server is reachable."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socketPath)
+    except OSError as e:
+        runner.verbose(f'Cannot connect to server at {socketPath}: {e}')
+        conn.close()
+        return None
+    with conn:
+        msg = {'args': argList, 'cwd': os.getcwd(), 'env': dict(os.environ)}
+        sendMessage(conn, msg, [0, 1, 2])
+        f = conn.makefile('rb')
+        pid = None
+        while True:
+            try:
+                line = f.readline()
+            except KeyboardInterrupt:
+                # The child runs in another process group, forward the interrupt.
+                if pid:
+                    import signal
+                    os.kill(pid, signal.SIGINT)
+                continue
+            if not line:
+                runner.printStderr('Connection to server closed unexpectedly')
+                return 1
+            reply = json.loads(line.decode('utf-8'))
+            if 'pid' in reply:
+                pid = reply['pid']
+            if 'exitCode' in reply:
+                return reply['exitCode']
+
+class Server:
+    def __init__(self, socketPath, globals):
+        self.socketPath = socketPath
+        self.globals = globals
+        self.children = {} # pid -> connection to the client
+
+    def preload(self, testFile, useUntypy):
+        import importlib
+        for m in PRELOAD_MODULES:
+            importlib.import_module(m)
+        runner.prepareLib(onlyCheckRunnable=False)
+        if testFile:
+            runner.verbose(f'Preloading tutor tests in {testFile}')
+            runner.preloadCode(testFile, useUntypy)
+
+    def serve(self):
+        import selectors
+        import signal
+        if os.path.exists(self.socketPath):
+            os.unlink(self.socketPath)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socketPath)
+        self.listener.listen()
+        # SIGCHLD wakes up the select call below
+        (self.wakeupRead, wakeupWrite) = os.pipe()
+        os.set_blocking(self.wakeupRead, False)
+        os.set_blocking(wakeupWrite, False)
+        signal.set_wakeup_fd(wakeupWrite)
+        signal.signal(signal.SIGCHLD, lambda _sig, _frame: None)
+        # Remove the socket file on termination
+        signal.signal(signal.SIGTERM, lambda _sig, _frame: sys.exit(0))
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.selector.register(self.wakeupRead, selectors.EVENT_READ)
+        runner.printStderr(f'Server listening on {self.socketPath}')
+        try:
+            while True:
+                for (key, _events) in self.selector.select():
+                    if key.fileobj is self.listener:
+                        self.accept()
+                    else:
+                        try:
+                            os.read(self.wakeupRead, 1024)
+                        except BlockingIOError:
+                            pass
+                        self.reapChildren()
+        finally:
+            os.unlink(self.socketPath)
+
+    def accept(self):
+        (conn, _addr) = self.listener.accept()
+        try:
+            (msg, fds) = recvMessage(conn, 3)
+        except (OSError, ValueError) as e:
+            runner.verbose(f'Invalid request: {e}')
+            conn.close()
+            return
+        if msg is None or len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+            return
+        pid = os.fork()
+        if pid == 0:
+            self.runChild(conn, msg, fds)
+        for fd in fds:
+            os.close(fd)
+        self.children[pid] = conn
+        try:
+            sendMessage(conn, {'pid': pid})
+        except OSError:
+            pass
+
+    def reapChildren(self):
+        while self.children:
+            try:
+                (pid, status) = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = self.children.pop(pid, None)
+            if conn is None:
+                continue
+            try:
+                sendMessage(conn, {'exitCode': exitCodeFromStatus(status)})
+            except OSError:
+                pass
+            conn.close()
+
+    def runChild(self, conn, msg, fds):
+        import signal
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.selector.close()
+            self.listener.close()
+            os.close(self.wakeupRead)
+            conn.close()
+            for (i, fd) in enumerate(fds):
+                os.dup2(fd, i)
+                os.close(fd)
+            sys.stdout.reconfigure(line_buffering=os.isatty(1))
+            os.environ.clear()
+            os.environ.update(msg['env'])
+            os.chdir(msg['cwd'])
+            runner.VERBOSE = False
+            runner.main(self.globals, msg['args'])
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                runner.printStderr(str(e.code))
+                code = 1
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+def serve(args, globals):
+    if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+        runner.printStderr('ERROR: --server is not supported on this platform')
+        runner.die(1)
+    server = Server(args.server, globals)
+    server.preload(args.testFile, useUntypy=args.checkTypes)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
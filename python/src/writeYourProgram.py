@@ -2,8 +2,14 @@
 import untypy
 import typing
 import dataclasses
-import inspect
 import types
+import sys
+import os
+import time
+import atexit
+import array
+import operator
+import weakref
 
 _DEBUG = False
 def _debug(s):
@@ -106,16 +112,89 @@ def _collectDataClassAttributes(cls):
     return result
 
 
+_RECORD_ROWS_ATTR = '__wyppRecordRows'
+
+class _RecordRows:
+    """
+    The field checkers and the unchecked constructor of a record, for constructing many
+    records from rows of field values (see fromRows and loadRecords).
+    """
+    def __init__(self, cls, rawInit, fieldType):
+        self.cls = cls
+        self.rawInit = rawInit
+        self.fieldType = fieldType
+        self.fields = [f for f in dataclasses.fields(cls) if f.init]
+        self.required = len([f for f in self.fields if f.default is dataclasses.MISSING and
+                                                       f.default_factory is dataclasses.MISSING])
+        self._checkers = None
+
+    def checkers(self):
+        """Returns a list of (name, checker, accepted types) with an entry for every field."""
+        if self._checkers is None:
+            # untypy.checker fetches the annotation lazily, see _patchDataClass
+            checkers = []
+            for f in self.fields:
+                c = untypy.checker(lambda name=f.name: self.fieldType(name), self.cls)
+                checkers.append((f.name, c, c.get_checker().accepted_types()))
+            self._checkers = checkers
+        return self._checkers
+
+    def new(self, values):
+        obj = object.__new__(self.cls)
+        self.rawInit(obj, *values)
+        return obj
+
+def _fromRows(cls, rows):
+    """
+    Constructs a record from every row of rows. A row is a tuple of the values of the
+    fields, as for the constructor. Errors name the row.
+    """
+    recordRows = getattr(cls, _RECORD_ROWS_ATTR)
+    checkers = recordRows.checkers()
+    result = []
+    n = len(checkers)
+    if recordRows.required == n:
+        expected = str(n)
+    else:
+        expected = f'between {recordRows.required} and {n}'
+    for (i, row) in enumerate(rows):
+        if not (recordRows.required <= len(row) <= n):
+            raise TypeError(f'Row {i} of {cls.__name__}.fromRows has {len(row)} values, ' +
+                            f'expected {expected}')
+        values = list(row)
+        for ((name, c, accepted), v, j) in zip(checkers, row, range(len(row))):
+            if type(v) in accepted:
+                continue
+            # The checker reports the caller of fromRows as responsible for errors
+            try:
+                values[j] = c(v)
+            except untypy.error.UntypyTypeError as e:
+                raise e.with_note(f'Field {name} in row {i}.') from None
+        result.append(recordRows.new(values))
+    return result
+
 def _patchDataClass(cls, mutable):
     fieldNames = [f.name for f in dataclasses.fields(cls)]
     setattr(cls, EQ_ATTRS_ATTR, fieldNames)
+    # Records with this __repr__ are formatted by _limitedRepr
+    setattr(cls, _RECORD_REPR_ATTR, cls.__repr__)
+
+    # The type hints of the class are resolved once, when the first field is checked.
+    hints = {}
+    def fieldType(name):
+        if not hints:
+            hints.update(typing.get_type_hints(cls, include_extras=True))
+        return hints[name]
 
     if hasattr(cls, '__annotations__'):
         # add annotions for type checked constructor.
         cls.__kind = 'record'
+        rawInit = cls.__init__
         cls.__init__.__annotations__ = _collectDataClassAttributes(cls)
         cls.__init__.__original = cls # mark class as source of annotation
         cls.__init__ = untypy.typechecked(cls.__init__)
+        setattr(cls, _RECORD_ROWS_ATTR, _RecordRows(cls, rawInit, fieldType))
+        cls.fromRows = classmethod(_fromRows)
 
     if mutable:
         # prevent new fields being added
@@ -128,26 +207,91 @@ def _patchDataClass(cls, mutable):
             if name in cls.__annotations__:
                 # This the type is wrapped in an lambda expression to allow for Forward Ref.
                 # Would the lambda expression be called at this moment, it may cause an name error
-                # untypy.checker fetches the annotation lazily.
-                checker[name] = untypy.checker(\
-                    lambda cls=cls,name=name: typing.get_type_hints(cls, include_extras=True)[name],
-                    cls)
+                # untypy.checker fetches the annotation lazily. It checks values of simple types
+                # without capturing the frame of the caller.
+                checker[name] = untypy.checker(lambda name=name: fieldType(name), cls)
 
         oldSetattr = cls.__setattr__
         def _setattr(obj, k, v):
             # Note __setattr__ also gets called in the constructor.
-            if k in checker:
-                oldSetattr(obj, k, checker[k](v))
-            elif k in fields:
-                oldSetattr(obj, k, v)
-            else:
+            c = checker.get(k)
+            if c is not None:
+                v = c(v)
+            elif k not in fields:
                 raise AttributeError(f'Unknown attribute {k} for record {cls.__name__}')
+            oldSetattr(obj, k, v)
         setattr(cls, "__setattr__", _setattr)
     return cls
 
-def record(cls=None, mutable=False):
+_HASH_ATTR = '__wyppHash'
+_USER_POST_INIT_ATTR = '__wyppUserPostInit'
+
+def _storeHash(obj, hashFun):
+    try:
+        h = hashFun(obj)
+    except TypeError:
+        # A field holds an unhashable value. hash(obj) raises the error again.
+        h = None
+    object.__setattr__(obj, _HASH_ATTR, h)
+
+def _cacheHash(cls):
+    """
+    Makes the instances of the frozen record cls compute their hash once, at the end of the
+    constructor. Must be called before cls becomes a dataclass, because the dataclass
+    decorator only calls __post_init__ if the class has one. Returns a function that
+    finishes the dataclass created from cls.
+    """
+    userPostInit = getattr(cls, '__post_init__', None)
+    # Do not compute the hash of a record twice if it inherits from another such record
+    userPostInit = getattr(userPostInit, _USER_POST_INIT_ATTR, userPostInit)
+    hashFun = None
+    def __post_init__(self):
+        if userPostInit is not None:
+            userPostInit(self)
+        _storeHash(self, hashFun)
+    setattr(__post_init__, _USER_POST_INIT_ATTR, userPostInit)
+    cls.__post_init__ = __post_init__
+    def finish(newCls):
+        nonlocal hashFun
+        hashFun = newCls.__hash__
+        def __hash__(self):
+            h = getattr(self, _HASH_ATTR)
+            return hashFun(self) if h is None else h
+        # The hash of strings differs between processes, so it is not pickled.
+        def __getstate__(self):
+            state = dict(self.__dict__)
+            state.pop(_HASH_ATTR, None)
+            return state
+        def __setstate__(self, state):
+            self.__dict__.update(state)
+            _storeHash(self, hashFun)
+        newCls.__hash__ = __hash__
+        newCls.__getstate__ = __getstate__
+        newCls.__setstate__ = __setstate__
+        return newCls
+    return finish
+
+def record(cls=None, mutable=False, slots=False, cacheHash=False):
+    """
+    Turns cls into a record. With mutable=True, fields can be assigned after construction.
+    With slots=True (Python 3.10 or newer), instances store their fields in __slots__
+    instead of a __dict__, so they need less memory. Methods of such records cannot use
+    super() without arguments.
+    With cacheHash=True, the hash of a frozen record is computed once, when it is
+    constructed, instead of on every use as key of a dict or element of a set.
+    """
     def wrap(cls):
-        newCls = dataclasses.dataclass(cls, frozen=not mutable)
+        if cacheHash and (mutable or slots):
+            raise TypeError('record(cacheHash=True) requires a frozen record without slots')
+        finish = _cacheHash(cls) if cacheHash else None
+        if slots:
+            if sys.version_info < (3, 10):
+                raise TypeError('record(slots=True) requires Python 3.10 or newer')
+            newCls = dataclasses.dataclass(cls, frozen=not mutable, slots=True)
+        else:
+            newCls = dataclasses.dataclass(cls, frozen=not mutable)
+        if finish:
+            newCls = finish(newCls)
         return _patchDataClass(newCls, mutable)
     # See if we're being called as @record or @record().
     if cls is None:
@@ -157,6 +301,174 @@ def record(cls=None, mutable=False):
         # We're called as @dataclass without parens.
         return wrap(cls)
 
+# Loading records from files
+
+_TRUE_STRINGS = {'True', 'true', '1'}
+_FALSE_STRINGS = {'False', 'false', '0'}
+
+def _parseBool(s):
+    if s in _TRUE_STRINGS:
+        return True
+    if s in _FALSE_STRINGS:
+        return False
+    raise ValueError(f'invalid literal for bool: {s!r}')
+
+# typing.Union and, from Python 3.10 on, types.UnionType for T | None
+_UNION_ORIGINS = (typing.Union,) + ((types.UnionType,) if hasattr(types, 'UnionType') else ())
+
+def _stringConverter(t):
+    """
+    Returns a function that converts a string from a CSV file to a value of type t or None
+    if there is no such conversion. The converted value is still checked against t.
+    """
+    if t is str:
+        return str
+    if t in (int, float, bool):
+        return _parseBool if t is bool else t
+    origin = typing.get_origin(t)
+    args = typing.get_args(t)
+    if origin is typing.Annotated:
+        return _stringConverter(args[0])
+    if origin in _UNION_ORIGINS and len(args) == 2 and type(None) in args:
+        # Optional[T] or T | None: an empty cell is None
+        conv = _stringConverter(args[0] if args[1] is type(None) else args[1])
+        if conv is None:
+            return None
+        return lambda s: None if s == '' else conv(s)
+    if origin is typing.Literal:
+        values = {str(a): a for a in args}
+        def convLiteral(s):
+            if s not in values:
+                raise ValueError(f'{s!r} is not one of {", ".join(map(repr, args))}')
+            return values[s]
+        return convLiteral
+    return None
+
+def _csvRows(f, delimiter):
+    """Yields (line, row) for the rows of a CSV file."""
+    import csv
+    reader = csv.reader(f, delimiter=delimiter)
+    for row in reader:
+        if row:
+            yield (reader.line_num, row)
+
+def _jsonLinesRows(f, path):
+    """Yields (line, value) for the JSON values in the lines of a file."""
+    import json
+    for (i, line) in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield (i, json.loads(line))
+            except ValueError as e:
+                raise ValueError(f'{path}, line {i}: {e}') from None
+
+def loadRecords(path, cls, converters=None, format=None, delimiter=',', encoding='utf-8-sig'):
+    """
+    Reads records of type cls from the file at path and returns an iterator that yields
+    them one by one.
+
+    The file is either a CSV file with a header line that names the fields of the record
+    or a file with one JSON object (field names to values) per line. format is 'csv' or
+    'jsonl'. By default, files with the suffixes .jsonl and .ndjson are JSON lines and all
+    other files are CSV files.
+
+    Values from CSV files are converted to the types of the fields. This works for str,
+    int, float, bool, Literal and Optional (an empty cell is None) of these types.
+    converters maps field names to functions that convert the values of other fields.
+    All values are checked against the types of the fields. Errors name the line of the
+    file. A missing file, a bad header or a field without conversion is reported by
+    loadRecords itself, errors in the rows while iterating.
+    """
+    recordRows = getattr(cls, _RECORD_ROWS_ATTR, None)
+    if recordRows is None:
+        raise TypeError(f'loadRecords expects a record, not {cls!r}')
+    if format is None:
+        format = 'jsonl' if os.path.splitext(path)[1] in ('.jsonl', '.ndjson') else 'csv'
+    if format not in ('csv', 'jsonl'):
+        raise ValueError(f'Unknown format {format!r} for loadRecords, expected csv or jsonl')
+    converters = converters or {}
+    checkers = recordRows.checkers()
+    fieldNames = [name for (name, _c, _accepted) in checkers]
+    for name in converters:
+        if name not in fieldNames:
+            raise ValueError(f'loadRecords: {recordRows.cls.__name__} has no field {name}')
+    convs = {}
+    for name in fieldNames:
+        convs[name] = converters.get(name)
+        if format == 'csv' and convs[name] is None:
+            convs[name] = _stringConverter(recordRows.fieldType(name))
+            if convs[name] is None:
+                raise TypeError(f'loadRecords: no conversion from strings to the type of ' +
+                                f'field {name}, please provide a converter')
+    # The file is opened and the header is checked now, the rows are read by the generator
+    f = open(path, encoding=encoding, newline='')
+    try:
+        if format == 'csv':
+            rows = _csvRows(f, delimiter)
+            (line, header) = next(rows, (1, None))
+            if header is None:
+                f.close()
+                return iter(())
+            header = [h.strip() for h in header]
+            unknown = [h for h in header if h not in fieldNames]
+            if unknown:
+                raise ValueError(f'{path}, line {line}: unknown columns {", ".join(unknown)}')
+            missing = [name for (name, field) in zip(fieldNames, recordRows.fields)
+                       if name not in header and field.default is dataclasses.MISSING and
+                       field.default_factory is dataclasses.MISSING]
+            if missing:
+                raise ValueError(f'{path}, line {line}: missing columns {", ".join(missing)}')
+            # CSV rows are lists, the plan for a field contains the index of its column
+            keys = [header.index(name) if name in header else None for name in fieldNames]
+        else:
+            rows = _jsonLinesRows(f, path)
+            header = None
+            keys = fieldNames
+    except:
+        f.close()
+        raise
+    # (name, key, converter, checker, accepted types, field) for every field
+    plan = [(name, key, convs[name], c, accepted, field) for ((name, c, accepted), key, field)
+            in zip(checkers, keys, recordRows.fields)]
+    return _loadRecords(f, rows, path, recordRows, plan, header, set(fieldNames))
+
+def _loadRecords(f, rows, path, recordRows, plan, header, fieldSet):
+    with f:
+        for (line, row) in rows:
+            if header is None:
+                if type(row) is not dict:
+                    raise ValueError(f'{path}, line {line}: expected a JSON object, not ' +
+                                     _shortRepr(row))
+                if not fieldSet.issuperset(row):
+                    raise ValueError(f'{path}, line {line}: unknown fields ' +
+                                     ', '.join(sorted(set(row) - fieldSet)))
+            elif len(row) != len(header):
+                raise ValueError(f'{path}, line {line}: {len(row)} values, expected {len(header)}')
+            values = []
+            for (name, key, conv, c, accepted, field) in plan:
+                try:
+                    if key is None or (header is None and key not in row):
+                        if field.default is not dataclasses.MISSING:
+                            values.append(field.default)
+                        elif field.default_factory is not dataclasses.MISSING:
+                            values.append(field.default_factory())
+                        else:
+                            raise ValueError('missing')
+                        continue
+                    v = row[key]
+                    if conv is not None:
+                        v = conv(v)
+                except ValueError as e:
+                    raise ValueError(f'{path}, line {line}, field {name}: {e}') from None
+                if type(v) not in accepted:
+                    # The checker reports the code iterating over the records as responsible
+                    try:
+                        v = c(v)
+                    except untypy.error.UntypyTypeError as e:
+                        raise e.with_note(f'Field {name} in line {line} of {path}.') from None
+                values.append(v)
+            yield recordRows.new(values)
+
 # Tests
 
 _die = False
@@ -179,9 +491,98 @@ def resetTestCount():
     global _testCount
     _testCount = {'total': 0, 'failing': 0}
 
+def getTestCount():
+    return dict(_testCount)
+
+def addTestCount(count):
+    global _testCount
+    _testCount = {
+        'total': _testCount['total'] + count['total'],
+        'failing': _testCount['failing'] + count['failing']
+    }
+
+# Test events: optionally, check and printTestResults write one JSON object per line
+# to a file, for consumption by graders and the IDE.
+_testEvents = None
+_lastTestEventTime = 0
+
+def setTestEventStream(target):
+    """
+    Writes test events as JSON lines to target, a file descriptor or a path.
+    None disables test events.
+
+    There is one event per call of check:
+    {"event": "check", "file": ..., "line": ..., "passed": ..., "duration": ...,
+     "compareDuration": ..., "actual": ..., "expected": ...}
+    duration is the time in seconds since the previous event, so it includes computing
+    the arguments of check. actual and expected are shortened reprs. printTestResults
+    writes {"event": "results", "prefix": ..., "total": ..., "failing": ...}.
+    """
+    global _testEvents, _lastTestEventTime
+    if _testEvents is not None:
+        _testEvents.close()
+        _testEvents = None
+    if target is None:
+        return
+    # Line buffered, so that events are not lost or duplicated when the process exits
+    # abruptly or forks (see runner.runTestFunctionsForked).
+    if isinstance(target, int):
+        _testEvents = open(target, 'w', encoding='utf-8', buffering=1, closefd=False)
+    else:
+        _testEvents = open(target, 'w', encoding='utf-8', buffering=1)
+    _lastTestEventTime = time.perf_counter()
+
+def _writeTestEvent(event):
+    import json
+    _testEvents.write(json.dumps(event) + '\n')
+
+_eventRepr = None
+
+def _shortRepr(x):
+    global _eventRepr
+    if _eventRepr is None:
+        import reprlib
+        _eventRepr = reprlib.Repr()
+        _eventRepr.maxstring = 80
+        _eventRepr.maxother = 80
+    try:
+        return _eventRepr.repr(x)
+    except Exception as e:
+        return f'<repr failed: {type(e).__name__}>'
+
+# Reports of failing checks are collected and written together, at the latest by
+# printTestResults. Locations are formatted only then.
+_bufferCheckFailures = True
+_checkFailures = [] # (filename, line, expected, actual, detail), see _formatCheckFailure
+_MAX_BUFFERED_CHECK_FAILURES = 1000
+
+def setBufferCheckFailures(b):
+    global _bufferCheckFailures
+    flushCheckFailures()
+    _bufferCheckFailures = b
+
+def flushCheckFailures():
+    global _checkFailures
+    if not _checkFailures:
+        return
+    failures = _checkFailures
+    _checkFailures = []
+    sys.stdout.write(''.join([f'FEHLER in {file}:{line}: Erwartet wird {expected}, aber das '
+                              f'Ergebnis ist {actual}{detail}\n'
+                              for (file, line, expected, actual, detail) in failures]))
+
+atexit.register(flushCheckFailures)
+if hasattr(os, 'register_at_fork'):
+    # Otherwise, the child would report the failures again
+    os.register_at_fork(before=flushCheckFailures)
+
 def printTestResults(prefix=''):
+    flushCheckFailures()
     total = _testCount['total']
     failing = _testCount['failing']
+    if _testEvents is not None:
+        _writeTestEvent({'event': 'results', 'prefix': prefix.strip(), 'total': total,
+                         'failing': failing})
     if total == 0:
         pass
     elif failing == 0:
@@ -196,32 +597,39 @@ def checkEq(actual, expected):
 def check(actual, expected, structuralObjEq=True, floatEqWithDelta=True):
     if not _checksEnabled:
         return
-    global _testCount
+    global _testCount, _lastTestEventTime
     flags = {'structuralObjEq': structuralObjEq, 'floatEqWithDelta': floatEqWithDelta}
+    if _testEvents is not None:
+        start = time.perf_counter()
     matches = deepEq(actual, expected, **flags)
     _testCount = {
         'total': _testCount['total'] + 1,
         'failing': _testCount['failing'] + (0 if matches else 1)
     }
+    if _testEvents is not None:
+        now = time.perf_counter()
+        caller = sys._getframe(1)
+        _writeTestEvent({'event': 'check', 'file': caller.f_code.co_filename,
+                         'line': caller.f_lineno, 'passed': matches,
+                         'duration': now - _lastTestEventTime, 'compareDuration': now - start,
+                         'actual': _shortRepr(actual), 'expected': _shortRepr(expected)})
+        _lastTestEventTime = now
     if not matches:
-        stack = inspect.stack()
-        caller = stack[1] if len(stack) > 1 else None
-        def fmt(x):
-            if type(x) == str:
-                return repr(x)
-            else:
-                return str(x)
-        msg = f"{caller.filename}:{caller.lineno}: Erwartet wird {fmt(expected)}, aber das " \
-            f"Ergebnis ist {fmt(actual)}"
+        caller = sys._getframe(1)
+        # expected and actual are formatted now, they might be mutated later
+        failure = (caller.f_code.co_filename, caller.f_lineno) + \
+            _formatCheckFailure(actual, expected, (structuralObjEq, floatEqWithDelta))
         if _dieOnCheckFailures():
-            raise Exception(msg)
-        else:
-            print("FEHLER in " + msg)
+            (file, line, expected, actual, detail) = failure
+            raise Exception(f"{file}:{line}: Erwartet wird {expected}, aber das "
+                            f"Ergebnis ist {actual}{detail}")
+        _checkFailures.append(failure)
+        if not _bufferCheckFailures or len(_checkFailures) >= _MAX_BUFFERED_CHECK_FAILURES:
+            flushCheckFailures()
 
 def uncoveredCase():
-    stack = inspect.stack()
-    caller = stack[1] if len(stack) > 1 else None
-    raise Exception(f"{caller.filename}, Zeile {caller.lineno}: ein Fall ist nicht abgedeckt")
+    caller = sys._getframe(1)
+    raise Exception(f"{caller.f_code.co_filename}, Zeile {caller.f_lineno}: ein Fall ist nicht abgedeckt")
 
 #
 # Deep equality
@@ -230,56 +638,243 @@ def _isNumber(x):
     t = type(x)
     return (t is int or t is float)
 
-def _seqEq(seq1, seq2, flags):
+# deepEq works with an explicit stack of pairs still to be compared, so deeply nested
+# values do not hit the recursion limit. The comparators below check one pair of values
+# and push the pairs of their components onto the stack. They return False if the values
+# differ. cfg is a pair (structuralObjEq, floatEqWithDelta).
+
+# Sequences at least this long are first compared with _approxNumbersEq
+_MIN_VECTORIZED_LEN = 8
+_NUMBER_TYPES = {int, float}
+
+def _approxNumbersEq(seq1, seq2):
+    """
+    Returns True if seq1 and seq2 contain only ints and floats and all pairs of elements
+    differ by less than _EPSILON. Iteration happens in C. False does not mean that the
+    sequences differ, for example for nan or inf elements.
+    """
+    if not (_NUMBER_TYPES.issuperset(map(type, seq1)) and
+            _NUMBER_TYPES.issuperset(map(type, seq2))):
+        return False
+    try:
+        return all(map(_EPSILON.__gt__, map(abs, map(operator.sub, seq1, seq2))))
+    except (OverflowError, TypeError):
+        return False
+
+def _seqEq(seq1, seq2, stack, cfg):
     if len(seq1) != len(seq2):
         return False
-    for i, x in enumerate(seq1):
-        y = seq2[i]
-        if not deepEq(x, y, **flags):
-            return False
+    if cfg[1] and len(seq1) >= _MIN_VECTORIZED_LEN and _approxNumbersEq(seq1, seq2):
+        return True
+    # Reversed, so that components are compared from left to right
+    stack.extend(zip(reversed(seq1), reversed(seq2)))
     return True
 
-def _dictEq(d1, d2, flags):
-    ks1 = sorted(d1.keys())
-    ks2 = sorted(d2.keys())
-    if ks1 != ks2: # keys should be exactly equal
+def _dictEq(d1, d2, stack, cfg):
+    if len(d1) != len(d2) or d1.keys() != d2.keys(): # keys should be exactly equal
+        return False
+    stack.extend([(d1[k], d2[k]) for k in reversed(d1.keys())])
+    return True
+
+def _approxSortedNumbersEq(xs, ys):
+    """
+    Returns True if the numbers in xs and ys can be paired such that the numbers of each
+    pair differ by less than _EPSILON. If such a pairing exists, pairing the numbers in
+    sorted order is one.
+    """
+    if len(xs) != len(ys) or any(x != x for x in xs) or any(y != y for y in ys):
+        return False # nan is not equal to anything
+    try:
+        return all(abs(x - y) < _EPSILON for (x, y) in zip(sorted(xs), sorted(ys)))
+    except OverflowError:
         return False
-    for k in ks1:
-        if not deepEq(d1[k], d2[k], **flags):
+
+def _setEq(s1, s2, stack, cfg):
+    if len(s1) != len(s2):
+        return False
+    if s1 == s2:
+        return True
+    # Elements without an equal counterpart might still be equal with respect to cfg,
+    # for example floats with a small difference.
+    only1 = [x for x in s1 if x not in s2]
+    only2 = [y for y in s2 if y not in s1]
+    numbers1 = [x for x in only1 if _isNumber(x)]
+    numbers2 = [y for y in only2 if _isNumber(y)]
+    if numbers1 or numbers2:
+        if not cfg[1] or not _approxSortedNumbersEq(numbers1, numbers2):
+            return False
+        only1 = [x for x in only1 if not _isNumber(x)]
+        only2 = [y for y in only2 if not _isNumber(y)]
+    for x in only1:
+        for (i, y) in enumerate(only2):
+            if _deepEq(x, y, cfg):
+                del only2[i]
+                break
+        else:
             return False
     return True
 
-def _objToDict(o):
-    d = {}
-    attrs = dir(o)
-    useAll = False
-    if hasattr(o, EQ_ATTRS_ATTR):
-        useAll = True
-        attrs = getattr(o, EQ_ATTRS_ATTR)
-    for n in attrs:
-        if not useAll and n and n[0] == '_':
-            continue
-        x = getattr(o, n)
-        d[n] = x
-    #print(d)
-    return d
+# Maps a class to its equality plan (names, nameSet, withInstanceAttrs): the names of the
+# attributes compared by structural equality. For records, these are the names in
+# __eqAttrs__. For other classes, they are the public attributes of the class, the public
+# attributes of each instance are added by _eqAttrs. names is None for classes with a
+# custom __dir__, their instances are inspected with dir every time.
+# Weak, so that classes defined again (for example in the REPL) do not stay alive.
+_eqPlans = weakref.WeakKeyDictionary()
+
+def _eqPlan(cls):
+    plan = _eqPlans.get(cls)
+    if plan is None:
+        eqAttrs = getattr(cls, EQ_ATTRS_ATTR, None)
+        if eqAttrs is not None:
+            names = tuple(eqAttrs)
+            plan = (names, frozenset(names), False)
+        elif cls.__dir__ is not object.__dir__:
+            plan = (None, None, False)
+        else:
+            names = tuple([n for n in dir(cls) if not n.startswith('_')])
+            plan = (names, frozenset(names), True)
+        _eqPlans[cls] = plan
+    return plan
+
+def _eqAttrs(o):
+    (names, nameSet, withInstanceAttrs) = _eqPlan(type(o))
+    if names is None:
+        return tuple([n for n in dir(o) if not n.startswith('_')])
+    if withInstanceAttrs:
+        d = getattr(o, '__dict__', None)
+        if d:
+            extra = [n for n in d if not n.startswith('_') and n not in nameSet]
+            if extra:
+                return names + tuple(extra)
+    return names
+
+def _objEq(o1, o2, stack, cfg):
+    if not cfg[0]:
+        return False # o1 == o2 already checked
+    names1 = _eqAttrs(o1)
+    names2 = _eqAttrs(o2)
+    if names1 is not names2 and (len(names1) != len(names2) or set(names1) != set(names2)):
+        return False
+    stack.extend([(getattr(o1, n), getattr(o2, n)) for n in reversed(names1)])
+    return True
+
+def _safeEq(v1, v2):
+    try:
+        return bool(v1 == v2)
+    except RecursionError:
+        # Cyclic values, compare them component-wise
+        return False
+    except ValueError:
+        # For example NumPy arrays, == returns an array without a truth value
+        return False
+
+def _ndarrayEq(a1, a2, stack, cfg, eqTried=False):
+    np = sys.modules['numpy']
+    if not isinstance(a2, np.ndarray) or a1.shape != a2.shape:
+        return False
+    kinds = (a1.dtype.kind, a2.dtype.kind)
+    # Like floatEqWithDelta for ints and floats, integer arrays are compared exactly
+    if cfg[1] and 'f' in kinds and kinds[0] in 'iuf' and kinds[1] in 'iuf':
+        with np.errstate(invalid='ignore', over='ignore'):
+            return bool(np.all((a1 == a2) | (np.abs(a1 - a2) < _EPSILON)))
+    return bool(np.array_equal(a1, a2))
+
+def _registerNumpy():
+    """Registers the comparator for NumPy arrays if numpy has been imported."""
+    np = sys.modules.get('numpy')
+    ndarray = getattr(np, 'ndarray', None)
+    if ndarray is not None and ndarray not in _COMPARATORS:
+        _COMPARATORS[ndarray] = _ndarrayEq
+        # == returns an array
+        _NO_TRY_EQ_TYPES.add(ndarray)
+
+# Comparators in _COMPARATORS and _otherEq get eqTried: True if _deepEq has already
+# evaluated v1 == v2 with result False. == is then not evaluated again, it might be
+# expensive or have side effects.
+
+def _containerEq(eq, cls):
+    def f(v1, v2, stack, cfg, eqTried=False):
+        if isinstance(v2, cls):
+            return eq(v1, v2, stack, cfg)
+        return not eqTried and _safeEq(v1, v2)
+    return f
+
+def _otherEq(v1, v2, stack, cfg, eqTried=False):
+    if not eqTried and _safeEq(v1, v2):
+        return True
+    for (cls, eq) in _SUBCLASS_COMPARATORS:
+        if isinstance(v1, cls):
+            return isinstance(v2, cls) and eq(v1, v2, stack, cfg)
+    return _objEq(v1, v2, stack, cfg)
+
+# Types compared with == only, except for numbers with floatEqWithDelta.
+_ATOMIC_TYPES = {int, float, bool, complex, str, bytes, type(None)}
+
+_SUBCLASS_COMPARATORS = [
+    (list, _seqEq), (tuple, _seqEq), (dict, _dictEq), ((set, frozenset), _setEq)
+]
 
-def _objEq(o1, o2, flags):
-    return _dictEq(_objToDict(o1), _objToDict(o2), flags)
+# Comparators for values of exactly these types
+_COMPARATORS = {
+    list: _containerEq(_seqEq, list),
+    tuple: _containerEq(_seqEq, tuple),
+    dict: _containerEq(_dictEq, dict),
+    set: _containerEq(_setEq, (set, frozenset)),
+    frozenset: _containerEq(_setEq, (set, frozenset)),
+    array.array: _containerEq(_seqEq, array.array),
+}
+
+# Types whose values are not compared with == in _deepEq
+_NO_TRY_EQ_TYPES = set()
 
 _EPSILON = 0.00001
 EQ_ATTRS_ATTR = '__eqAttrs__'
 
-def _useFloatEqWithDelta(flags):
-    return flags.get('floatEqWithDelta', False)
-
-def _useStructuralObjEq(flags):
-    return flags.get('structuralObjEq', False)
+# With tryEq, pairs of containers are first compared with ==, which is implemented in C
+# and returns quickly for equal values. After == has hit the recursion limit once (for
+# cyclic or very deeply nested values), the remaining pairs are only compared component-wise.
+def _deepEq(v1, v2, cfg, tryEq=True):
+    floatEqWithDelta = cfg[1]
+    stack = [(v1, v2)]
+    # Pairs of values that are being compared or have been compared, by identity. The
+    # values are kept alive so that their ids are not reused. If a pair is reached again,
+    # it is equal unless some other component differs.
+    seen = {}
+    while stack:
+        (x, y) = stack.pop()
+        if x is y:
+            continue
+        t = type(x)
+        if t in _ATOMIC_TYPES:
+            if x == y:
+                continue
+            if floatEqWithDelta and (t is float or t is int) and _isNumber(y) and \
+                    abs(x - y) < _EPSILON:
+                continue
+            return False
+        eqTried = False
+        if tryEq and t not in _NO_TRY_EQ_TYPES:
+            try:
+                if x == y:
+                    continue
+                eqTried = True
+            except RecursionError:
+                tryEq = False
+            except ValueError:
+                eqTried = True # see _safeEq
+        key = (id(x), id(y))
+        if key in seen:
+            continue
+        seen[key] = (x, y)
+        if not _COMPARATORS.get(t, _otherEq)(x, y, stack, cfg, eqTried):
+            return False
+    return True
 
 # Supported flags:
-# - structuralObjEq: causes objects to be compared as dictionaries. The keys are by default
-#   taken from dir(obj), if obj as the attribute __eqAttrs__, then the names listed there
-#   are taken. Defaults to False.
+# - structuralObjEq: causes objects to be compared attribute by attribute. The attributes are
+#   by default the public names in dir(obj), if the class of obj has the attribute
+#   __eqAttrs__, then the names listed there are taken (see _eqPlan). Defaults to False.
 # - floatEqWithDelta: compares floats by checking whether the difference is smaller than a
 #   small delta. Setting this to True loses transitivity of eq.
 def deepEq(v1, v2, **flags):
@@ -287,30 +882,184 @@ def deepEq(v1, v2, **flags):
     Computes deep equality of v1 and v2. With structuralObjEq=False, objects are compared
     by __eq__. Otherwise, objects are compared attribute-wise, only those attributes
     returned by dir that do not start with an underscore are compared.
+    Lists, tuples, dicts and sets are compared component-wise, cyclic values are supported.
     """
-    # print(f'deepEq: v1={v1}, v2={v2}, flags={flags}')
-    if v1 == v2:
+    if v1 is v2:
         return True
-    if _isNumber(v1) and _isNumber(v2) and _useFloatEqWithDelta(flags):
-        diff = v1 - v2
-        if abs(diff) < _EPSILON:
-            return True
-        else:
-            return False
-    if isinstance(v1, list):
-        return isinstance(v2, list) and _seqEq(v1, v2, flags)
-    if isinstance(v1, tuple):
-        return isinstance(v2, tuple) and _seqEq(v1, v2, flags)
-    if isinstance(v1, dict):
-        return isinstance(v2, dict) and _dictEq(v1, v2, flags)
-    if type(v1) == str:
-        return False
-    if hasattr(v1, '__class__'):
-        if _useStructuralObjEq(flags):
-            return _objEq(v1, v2, flags)
+    if 'numpy' in sys.modules:
+        _registerNumpy()
+    cfg = (flags.get('structuralObjEq', False), flags.get('floatEqWithDelta', False))
+    return _deepEq(v1, v2, cfg)
+
+#
+# Failure reports
+#
+# Large values are not formatted completely in the report of a failing check. Instead,
+# the report shows the beginning of both values and the first difference.
+
+# Maximal length of a value in a failure report
+_MAX_REPORTED_VALUE_LEN = 1000
+# Maximal length of the path and of the values at the first difference
+_MAX_REPORTED_DIFF_LEN = 200
+_RECORD_REPR_ATTR = '__wyppRecordRepr'
+
+class _ReprBudgetExhausted(Exception):
+    pass
+
+def _reprParts(x, parts, budget, active, useStr):
+    def add(s):
+        if len(s) > budget[0]:
+            parts.append(s[:budget[0]])
+            budget[0] = 0
+            raise _ReprBudgetExhausted()
+        parts.append(s)
+        budget[0] -= len(s)
+    def addAll(open, items, close, fmtItem):
+        if id(x) in active:
+            add(open + '...' + close)
+            return
+        active.add(id(x))
+        add(open)
+        for (i, item) in enumerate(items):
+            if i > 0:
+                add(', ')
+            fmtItem(item)
+        add(close)
+        active.discard(id(x))
+    def fmt(y):
+        _reprParts(y, parts, budget, active, False)
+    t = type(x)
+    if t is str:
+        # Do not copy huge strings
+        add(repr(x[:budget[0]]) if len(x) > budget[0] else repr(x))
+    elif t is list:
+        addAll('[', x, ']', fmt)
+    elif t is tuple:
+        addAll('(', x, ',)' if len(x) == 1 else ')', fmt)
+    elif t is dict:
+        def fmtEntry(k):
+            fmt(k)
+            add(': ')
+            fmt(x[k])
+        addAll('{', x, '}', fmtEntry)
+    elif (t is set or t is frozenset) and x:
+        addAll('{' if t is set else 'frozenset({', x, '}' if t is set else '})', fmt)
+    elif useStr and t.__str__ is not object.__str__:
+        add(str(x))
+    elif getattr(t, _RECORD_REPR_ATTR, None) is t.__repr__:
+        def fmtField(name):
+            add(name + '=')
+            fmt(getattr(x, name))
+        addAll(t.__qualname__ + '(', getattr(t, EQ_ATTRS_ATTR), ')', fmtField)
+    else:
+        add(str(x) if useStr else repr(x))
+
+def _limitedRepr(x, limit, useStr=False):
+    """
+    Returns repr(x), or str(x) with useStr, but with at most limit characters. Lists, tuples,
+    dicts, sets and records are formatted only up to the limit. If the result is
+    truncated, it ends with '...'. The second component of the result is True in this case.
+    """
+    parts = []
+    try:
+        _reprParts(x, parts, [limit], set(), useStr)
+    except (_ReprBudgetExhausted, RecursionError):
+        return (''.join(parts) + '...', True)
+    return (''.join(parts), False)
+
+def _checkRepr(x, limit):
+    # Strings are quoted, other values formatted with str
+    return _limitedRepr(x, limit, useStr=type(x) is not str)
+
+def _differingComponents(x, y, cfg):
+    """
+    Returns the components of x and y as triples (label, componentOfX, componentOfY), or
+    None if x and y differ themselves, for example in their types. For sequences of
+    different lengths, only the elements of the common prefix are returned.
+    """
+    for cls in (list, tuple, array.array):
+        if isinstance(x, cls):
+            if not isinstance(y, cls):
+                return None
+            return ((f'[{i}]', a, b) for (i, (a, b)) in enumerate(zip(x, y)))
+    if isinstance(x, dict):
+        if not isinstance(y, dict) or x.keys() != y.keys():
+            return None
+        return ((f'[{_limitedRepr(k, 50)[0]}]', x[k], y[k]) for k in x)
+    if not cfg[0] or type(x) in _ATOMIC_TYPES or isinstance(x, (set, frozenset)):
+        return None
+    names = _eqAttrs(x)
+    if set(names) != set(_eqAttrs(y)):
+        return None
+    return ((f'.{n}', getattr(x, n), getattr(y, n)) for n in names)
+
+def _firstDifference(x, y, cfg):
+    """
+    Returns (path, a, b) where a and b are the first differing components of the
+    differing values x and y, at the given path (for example '[17].children[3].value').
+    """
+    path = []
+    seen = set()
+    while True:
+        components = _differingComponents(x, y, cfg)
+        if components is None:
+            break
+        for (label, a, b) in components:
+            if not _deepEq(a, b, cfg):
+                break
         else:
-            return False # v1 == v2 already checked
-    return False
+            break
+        if (id(a), id(b)) in seen:
+            break # cyclic values
+        seen.add((id(a), id(b)))
+        path.append(label)
+        (x, y) = (a, b)
+    return (''.join(path), x, y)
+
+def _formatCheckFailure(actual, expected, cfg):
+    """
+    Returns (expected, actual, detail) for the report of a failing check. detail describes
+    the first difference if one of the values is too long to be shown completely.
+    """
+    (expectedStr, truncated1) = _checkRepr(expected, _MAX_REPORTED_VALUE_LEN)
+    (actualStr, truncated2) = _checkRepr(actual, _MAX_REPORTED_VALUE_LEN)
+    detail = ''
+    if truncated1 or truncated2:
+        try:
+            (path, a, e) = _firstDifference(actual, expected, cfg)
+        except Exception:
+            # Attributes might not be accessible, for example
+            return (expectedStr, actualStr, detail)
+        detail = '\n    Erster Unterschied' + _describeDifference(path, a, e)
+    return (expectedStr, actualStr, detail)
+
+def _describeDifference(path, actual, expected):
+    def fmt(x):
+        return _checkRepr(x, _MAX_REPORTED_DIFF_LEN)[0]
+    def at(path):
+        if len(path) > _MAX_REPORTED_DIFF_LEN:
+            path = '...' + path[-_MAX_REPORTED_DIFF_LEN:]
+        return f' bei {path}' if path else ''
+    (a, e) = (actual, expected)
+    if type(a) is str and type(e) is str:
+        # Context around the first differing character
+        i = len(os.path.commonprefix([a, e]))
+        start = max(0, i - 20)
+        end = start + _MAX_REPORTED_DIFF_LEN // 2
+        def context(s):
+            return ('...' if start > 0 else '') + repr(s[start:end]) + ('...' if end < len(s) else '')
+        return f'{at(path)} an Position {i}: erwartet wird {context(e)}, aber das Ergebnis ist ' \
+            f'{context(a)}'
+    if isinstance(a, (list, tuple)) and type(a) is type(e) and len(a) != len(e):
+        # The common prefix is equal, see _differingComponents
+        n = min(len(a), len(e))
+        lens = f'(Länge {len(a)} statt {len(e)})'
+        if len(e) > n:
+            return f'{at(path + f"[{n}]")}: erwartet wird {fmt(e[n])}, aber das Ergebnis ' \
+                f'endet hier {lens}'
+        return f'{at(path + f"[{n}]")}: erwartet wird das Ende, aber das Ergebnis ist ' \
+            f'{fmt(a[n])} {lens}'
+    return f'{at(path)}: erwartet wird {fmt(e)}, aber das Ergebnis ist {fmt(a)}'
 
 # Additional functions and aliases
 
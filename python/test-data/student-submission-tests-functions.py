@@ -0,0 +1,13 @@
+from wypp import *
+
+check(incByOne(0), 1)
+
+def test_small():
+    check(incByOne(1), 2)
+    check(incByOne(2), 3)
+
+def test_large():
+    check(incByOne(41), 42)
+
+def test_negative():
+    check(incByOne(-1), 0)
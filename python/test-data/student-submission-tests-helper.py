@@ -0,0 +1,8 @@
+from wypp import *
+
+# Written before test functions were called automatically
+def test_helper(x):
+    check(incByOne(x), x + 1)
+
+test_helper(1)
+test_helper(41)
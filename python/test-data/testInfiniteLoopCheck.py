@@ -0,0 +1,5 @@
+from wypp import *
+
+check(1, 2)
+while True:
+    pass
@@ -0,0 +1,4 @@
+def inc(x: int) -> int: return x + 1
+def show(x: int) -> int: return str(x)
+
+print(inc(1))
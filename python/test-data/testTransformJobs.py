@@ -0,0 +1,4 @@
+import localMod
+import testTypes2
+
+print('END')
@@ -0,0 +1,44 @@
+import unittest
+import os
+import tempfile
+import cache
+
+class TestCodeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.oldDir = os.environ.get('WYPP_CACHE_DIR')
+        os.environ['WYPP_CACHE_DIR'] = self.dir.name
+
+    def tearDown(self):
+        if self.oldDir is None:
+            os.environ.pop('WYPP_CACHE_DIR', None)
+        else:
+            os.environ['WYPP_CACHE_DIR'] = self.oldDir
+        self.dir.cleanup()
+
+    def test_storeAndLoad(self):
+        src = 'x = 1 + 2\n'
+        code = compile(src, 'tests.py', 'exec')
+        self.assertIsNone(cache.loadCode(src, 'tests.py', True))
+        cache.storeCode(src, 'tests.py', True, code)
+        loaded = cache.loadCode(src, 'tests.py', True)
+        d = {}
+        exec(loaded, d)
+        self.assertEqual(3, d['x'])
+        self.assertIsNone(cache.loadCode(src, 'tests.py', False))
+        self.assertIsNone(cache.loadCode(src, 'other.py', True))
+        self.assertIsNone(cache.loadCode('x = 1 + 3\n', 'tests.py', True))
+
+    def test_disabledByDefault(self):
+        del os.environ['WYPP_CACHE_DIR']
+        src = 'x = 1 + 2\n'
+        cache.storeCode(src, 'tests.py', True, compile(src, 'tests.py', 'exec'))
+        self.assertIsNone(cache.loadCode(src, 'tests.py', True))
+        self.assertEqual([], os.listdir(self.dir.name))
+        cache.setCodeCacheDir(self.dir.name)
+        try:
+            cache.storeCode(src, 'tests.py', True, compile(src, 'tests.py', 'exec'))
+            self.assertIsNotNone(cache.loadCode(src, 'tests.py', True))
+        finally:
+            cache.setCodeCacheDir(None)
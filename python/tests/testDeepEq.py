@@ -1,4 +1,10 @@
 import unittest
+import array
+import gc
+try:
+    import numpy
+except ImportError:
+    numpy = None
 import sample
 from writeYourProgram import *
 from writeYourProgram import deepEq
@@ -53,11 +59,10 @@ class TestDeepEq(unittest.TestCase):
         l2 = [1]
         l1.append(l1)
         l2.append(l2)
-        try:
-            deepEq(l1, l2)
-            self.fail("Exception expected")
-        except RecursionError:
-            pass
+        self.assertTrue(deepEq(l1, l2))
+        l3 = [2]
+        l3.append(l3)
+        self.assertFalse(deepEq(l1, l3))
         self.assertFalse(deepEq(C(42.0), C(42.0000000000001),
                                 structuralObjEq=False, floatEqWithDelta=True))
         self.assertTrue(deepEq(C(42.0), C(42.0000000000001),
@@ -92,3 +97,96 @@ class TestDeepEq(unittest.TestCase):
         ))
         self.assertTrue(deepEq(A(2), A(2), structuralObjEq=True, floatEqWithDelta=True))
         self.assertFalse(deepEq(A(2), A(2), structuralObjEq=False, floatEqWithDelta=True))
+
+    def test_containers(self):
+        self.assertTrue(deepEq({1.0, 2.0}, {1.000000000001, 2.0}, floatEqWithDelta=True))
+        self.assertFalse(deepEq({1.0, 2.0}, {1.000000000001, 2.0}))
+        self.assertFalse(deepEq({1.0, 2.0}, {1.1, 2.0}, floatEqWithDelta=True))
+        self.assertFalse(deepEq({1}, [1]))
+        self.assertTrue(deepEq(frozenset([1]), {1}))
+        # keys that cannot be sorted
+        self.assertTrue(deepEq({1: 1.0, 'a': 2}, {'a': 2, 1: 1.00000000001}, floatEqWithDelta=True))
+        self.assertFalse(deepEq({1: 1, 'a': 2}, {'b': 2, 1: 1}))
+        self.assertFalse(deepEq((1, 2), [1, 2]))
+        xs = {i / 7 for i in range(10000)}
+        ys = {x + 0.000000001 for x in xs}
+        self.assertTrue(deepEq(xs, ys, floatEqWithDelta=True))
+        self.assertFalse(deepEq(xs, (ys - {min(ys)}) | {5000.1}, floatEqWithDelta=True))
+        self.assertTrue(deepEq({1.0, (2.0,), 'a'}, {1.000000000001, (2.000000000001,), 'a'},
+                               floatEqWithDelta=True))
+        self.assertFalse(deepEq({1.0, float('nan')}, {1.0, float('nan')}, floatEqWithDelta=True))
+
+    def test_eqOnce(self):
+        calls = []
+        class E:
+            def __eq__(self, other):
+                calls.append(other)
+                return False
+        e = E()
+        self.assertFalse(deepEq(e, 1))
+        self.assertEqual(1, len(calls))
+
+    def test_deeplyNested(self):
+        def nest(x, n):
+            for _ in range(n):
+                x = [x, 1.0]
+            return x
+        self.assertTrue(deepEq(nest(1.0, 100000), nest(1.0000000001, 100000),
+                               floatEqWithDelta=True))
+        self.assertFalse(deepEq(nest(1.0, 100000), nest(2.0, 100000), floatEqWithDelta=True))
+
+    def test_cyclicObjects(self):
+        c1 = C(1.0)
+        c1.next = c1
+        c2 = C(1.0000000001)
+        c2.next = c2
+        self.assertTrue(deepEq(c1, c2, structuralObjEq=True, floatEqWithDelta=True))
+        self.assertFalse(deepEq(c1, c2, structuralObjEq=False, floatEqWithDelta=True))
+
+    def test_structuralObjEqPlans(self):
+        c1 = C(1)
+        c2 = C(1)
+        c2.y = 2
+        self.assertFalse(deepEq(c1, c2, structuralObjEq=True))
+        c1.y = 2
+        self.assertTrue(deepEq(c1, c2, structuralObjEq=True))
+        c1._hidden = 3
+        self.assertTrue(deepEq(c1, c2, structuralObjEq=True))
+        self.assertEqual(('x', 'y'), wypp._eqPlan(Point)[0])
+        class Local:
+            pass
+        wypp._eqPlan(Local)
+        self.assertIn(Local, wypp._eqPlans)
+        n = len(wypp._eqPlans)
+        del Local
+        gc.collect()
+        self.assertEqual(n - 1, len(wypp._eqPlans))
+        self.assertTrue(deepEq([Point(1.0, 2.0)] * 3, [sample.Point(1.0, 2.0)] * 3,
+                               structuralObjEq=True))
+        self.assertFalse(deepEq([Point(1.0, 2.0)] * 3, [sample.Point(1.0, 2.0)] * 2 + [C(1)],
+                                structuralObjEq=True))
+
+    def test_numericSequences(self):
+        xs = [float(i) for i in range(100)]
+        ys = [x + 0.000000001 for x in xs]
+        self.assertTrue(deepEq(xs, ys, floatEqWithDelta=True))
+        self.assertFalse(deepEq(xs, ys, floatEqWithDelta=False))
+        self.assertTrue(deepEq(tuple(xs), tuple(ys), floatEqWithDelta=True))
+        ys[50] = 50.1
+        self.assertFalse(deepEq(xs, ys, floatEqWithDelta=True))
+        inf = float('inf')
+        self.assertTrue(deepEq(xs + [inf], xs + [inf], floatEqWithDelta=True))
+        self.assertFalse(deepEq(xs + [True], xs + [1.0000000001], floatEqWithDelta=True))
+        self.assertTrue(deepEq(array.array('d', xs), array.array('d', [x + 0.000000001 for x in xs]),
+                               floatEqWithDelta=True))
+        self.assertFalse(deepEq(array.array('d', [1.0]), array.array('d', [2.0])))
+        self.assertFalse(deepEq(array.array('d', xs), xs))
+
+    @unittest.skipUnless(numpy, 'numpy not installed')
+    def test_numpyArrays(self):
+        a = numpy.arange(100, dtype=float)
+        self.assertTrue(deepEq(a, a + 0.000000001, floatEqWithDelta=True))
+        self.assertFalse(deepEq(a, a + 0.000000001, floatEqWithDelta=False))
+        self.assertFalse(deepEq(a, a + 0.1, floatEqWithDelta=True))
+        self.assertFalse(deepEq(a, a[:50], floatEqWithDelta=True))
+        self.assertTrue(deepEq([a], [numpy.arange(100)], floatEqWithDelta=True))
@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+import tempfile
+import untypy
+from writeYourProgram import *
+
+@record
+class Person:
+    name: str
+    age: nat
+    height: float = 1.8
+    student: bool = False
+    city: Optional[str] = None
+    size: Literal['S', 'M', 'L'] = 'M'
+
+class TestLoadRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv(self):
+        path = self.write('people.csv',
+                          '﻿name,age,student,city,size\n' +
+                          'Anna,30,true,Köln,S\n' +
+                          '\n' +
+                          '"Bernd, B.",40,0,,L\n')
+        records = loadRecords(path, Person)
+        self.assertEqual(Person('Anna', 30, 1.8, True, 'Köln', 'S'), next(records))
+        self.assertEqual([Person('Bernd, B.', 40, 1.8, False, None, 'L')], list(records))
+        path = self.write('people.txt', 'age;name\n1;Carla\n')
+        self.assertEqual([Person('Carla', 1)], list(loadRecords(path, Person, delimiter=';')))
+
+    def test_jsonLines(self):
+        path = self.write('people.jsonl',
+                          '{"name": "Anna", "age": 30, "city": "Köln"}\n' +
+                          '{"name": "Bernd", "age": 40, "height": 2}\n')
+        self.assertEqual([Person('Anna', 30, city='Köln'), Person('Bernd', 40, 2)],
+                         list(loadRecords(path, Person)))
+
+    def test_converters(self):
+        @record
+        class Course:
+            name: str
+            members: list[str]
+        path = self.write('courses.csv', 'name,members\nInfo,Anna Bernd\n')
+        courses = list(loadRecords(path, Course, converters={'members': str.split}))
+        self.assertEqual([Course('Info', ['Anna', 'Bernd'])], courses)
+        self.assertRaises(TypeError, lambda: loadRecords(path, Course))
+        path = self.write('courses.data', '{"name": "Info", "members": ["Anna"]}\n')
+        self.assertEqual([Course('Info', ['Anna'])], list(loadRecords(path, Course, format='jsonl')))
+
+    def test_errors(self):
+        def load(content, name='people.csv'):
+            return list(loadRecords(self.write(name, content), Person))
+        for (content, message) in [
+                ('name,age\nAnna,30\nBernd,x\n', 'line 3, field age: invalid literal'),
+                ('name,age\nAnna,30\nBernd,40,1.7\n', 'line 3: 3 values, expected 2'),
+                ('name,height\nAnna,1.7\n', 'line 1: missing columns age'),
+                ('name,age,weight\n', 'line 1: unknown columns weight'),
+                ('name,age,size\nAnna,30,XL\n', "line 2, field size: 'XL' is not one of")]:
+            with self.assertRaises(ValueError) as cm:
+                load(content)
+            self.assertIn(message, str(cm.exception))
+        with self.assertRaises(ValueError) as cm:
+            load('{"name": "Anna", "age": 30}\n{"name": "Bernd"}\n', 'people.jsonl')
+        self.assertIn('people.jsonl, line 2, field age: missing', str(cm.exception))
+        with self.assertRaises(untypy.error.UntypyTypeError) as cm:
+            load('name,age\nAnna,30\nBernd,-1\n')
+        self.assertEqual(-1, cm.exception.given)
+        self.assertIn('Field age in line 3 of', cm.exception.notes[0])
+        self.assertEqual([], load(''))
+
+    def test_eagerErrors(self):
+        # Errors that do not depend on the rows are raised by loadRecords itself
+        self.assertRaises(FileNotFoundError,
+                          lambda: loadRecords(os.path.join(self.dir.name, 'none.csv'), Person))
+        path = self.write('people.csv', 'name,height\nAnna,1.7\n')
+        with self.assertRaises(ValueError) as cm:
+            loadRecords(path, Person)
+        self.assertIn('line 1: missing columns age', str(cm.exception))
+        records = loadRecords(self.write('people.csv', 'name,age\nAnna,x\n'), Person)
+        self.assertRaises(ValueError, lambda: next(records))
+
+    def test_stringConverter(self):
+        import writeYourProgram as wypp
+        conv = wypp._stringConverter(Optional[int])
+        self.assertEqual([None, 1], [conv(''), conv('1')])
+        if sys.version_info >= (3, 10):
+            conv = wypp._stringConverter(int | None)
+            self.assertEqual([None, 1], [conv(''), conv('1')])
+            conv = wypp._stringConverter(None | bool)
+            self.assertEqual([None, True], [conv(''), conv('true')])
+        self.assertIsNone(wypp._stringConverter(Union[int, str]))
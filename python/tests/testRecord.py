@@ -3,6 +3,8 @@ from writeYourProgram import *
 import sys
 import traceback
 import dataclasses
+import copy
+import untypy
 
 setDieOnCheckFailures(True)
 
@@ -125,3 +127,88 @@ class TestRecords(unittest.TestCase):
             self.fail('Expected FrozenInstanceError')
         except dataclasses.FrozenInstanceError:
             pass
+
+    def test_createChecked(self):
+        self.assertEqual(Point(1, 2.5), Point(x=1, y=2.5))
+        self.assertRaises(untypy.error.UntypyTypeError, lambda: Point(1, 'x'))
+        self.assertRaises(untypy.error.UntypyTypeError, lambda: Point(True, 2))
+        self.assertRaises(untypy.error.UntypyTypeError, lambda: Point(1))
+        self.assertEqual(Point(1, 2), Square(Point(1, 2), 3).center)
+
+    @unittest.skipIf(sys.version_info < (3, 10), 'slots require Python 3.10')
+    def test_slots(self):
+        @record(slots=True)
+        class SlotPoint:
+            x: float
+            y: float
+        @record(mutable=True, slots=True)
+        class SlotBox:
+            x: int
+        @record(slots=True)
+        class SlotPoint3(SlotPoint):
+            z: float
+        p = SlotPoint3(1, 2, 3)
+        self.assertFalse(hasattr(p, '__dict__'))
+        self.assertTrue(str(p).endswith('SlotPoint3(x=1, y=2, z=3)'))
+        self.assertEqual(['x', 'y', 'z'], SlotPoint3.__eqAttrs__)
+        self.assertRaises(dataclasses.FrozenInstanceError, lambda: setattr(p, 'x', 2))
+        self.assertRaises(untypy.error.UntypyTypeError, lambda: SlotPoint3(1, 2, 'x'))
+        b = SlotBox(1)
+        b.x = 2
+        self.assertEqual(2, b.x)
+        self.assertRaises(untypy.error.UntypyTypeError, lambda: setattr(b, 'x', 'y'))
+        self.assertRaises(AttributeError, lambda: setattr(b, 'y', 1))
+        self.assertFalse(hasattr(b, '__dict__'))
+
+    def test_cacheHash(self):
+        created = []
+        @record(cacheHash=True)
+        class Node:
+            name: str
+            center: Point
+            def __post_init__(self):
+                created.append(self)
+        @record(cacheHash=True)
+        class WeightedNode(Node):
+            weight: int
+        n = Node('a', Point(1, 2))
+        w = WeightedNode('a', Point(1, 2), 3)
+        self.assertEqual(hash(('a', Point(1, 2))), hash(n))
+        self.assertEqual(hash(('a', Point(1, 2), 3)), hash(w))
+        self.assertEqual([n, w], created)
+        self.assertEqual({n: 1, w: 2}, {Node('a', Point(1, 2)): 1, w: 2})
+        self.assertEqual('WeightedNode', type(w).__name__)
+        self.assertTrue(str(w).endswith("WeightedNode(name='a', center=Point(x=1, y=2), weight=3)"))
+        self.assertEqual(w, copy.deepcopy(w))
+        # The hash is recomputed after unpickling
+        self.assertEqual(['name', 'center', 'weight'], list(w.__getstate__()))
+        self.assertEqual(hash(w), hash(copy.copy(w)))
+        @record(cacheHash=True)
+        class Items:
+            items: list[int]
+        self.assertRaises(TypeError, lambda: hash(Items([1])))
+        self.assertRaises(TypeError, lambda: record(mutable=True, cacheHash=True)(Items))
+
+    def test_fromRows(self):
+        @record
+        class Person:
+            name: str
+            age: int
+            height: float = 1.8
+        rows = [('Anna', 30), ('Bernd', 40, 1.7)]
+        self.assertEqual([Person('Anna', 30), Person('Bernd', 40, 1.7)],
+                         Person.fromRows(iter(rows)))
+        self.assertEqual([Box(1)], Box.fromRows([(1,)]))
+        try:
+            Person.fromRows(rows + [('Carla', '50')])
+            self.fail('Expected UntypyTypeError')
+        except untypy.error.UntypyTypeError as e:
+            self.assertEqual('50', e.given)
+            self.assertIn('Field age in row 2.', e.notes)
+        with self.assertRaises(TypeError) as cm:
+            Person.fromRows([('Anna', 30), ('Bernd',)])
+        self.assertEqual('Row 1 of Person.fromRows has 1 values, expected between 2 and 3',
+                         str(cm.exception))
+        with self.assertRaises(TypeError) as cm:
+            Box.fromRows([()])
+        self.assertEqual('Row 0 of Box.fromRows has 0 values, expected 1', str(cm.exception))
@@ -0,0 +1,100 @@
+import unittest
+import json
+import os
+import tempfile
+import io
+import contextlib
+from writeYourProgram import *
+import writeYourProgram as w
+
+class TestTestEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.oldCount = w._testCount
+        resetTestCount()
+        (fd, self.path) = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+
+    def tearDown(self):
+        setTestEventStream(None)
+        w._testCount = self.oldCount
+        os.remove(self.path)
+
+    def readEvents(self):
+        setTestEventStream(None)
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(l) for l in f]
+
+    def test_events(self):
+        setTestEventStream(self.path)
+        check(1 + 1, 2)
+        check('x' * 200, 'y')
+        printTestResults()
+        [e1, e2, e3] = self.readEvents()
+        self.assertEqual('check', e1['event'])
+        self.assertTrue(e1['passed'])
+        self.assertEqual(__file__, e1['file'])
+        self.assertEqual('2', e1['actual'])
+        self.assertFalse(e2['passed'])
+        self.assertEqual(e1['line'] + 1, e2['line'])
+        self.assertLess(len(e2['actual']), 100)
+        self.assertGreaterEqual(e2['duration'], e2['compareDuration'])
+        self.assertEqual({'event': 'results', 'prefix': '', 'total': 2, 'failing': 1}, e3)
+
+    def test_disabled(self):
+        check(1, 1)
+        self.assertEqual([], self.readEvents())
+
+class TestCheckFailures(unittest.TestCase):
+
+    def setUp(self):
+        self.oldCount = w._testCount
+
+    def tearDown(self):
+        w._testCount = self.oldCount
+
+    def test_bufferedUntilResults(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            l = [1]
+            check(l, [2])
+            l.append(3)
+            self.assertEqual('', out.getvalue())
+            printTestResults()
+        self.assertIn(f'FEHLER in {__file__}:', out.getvalue())
+        self.assertIn('Erwartet wird [2], aber das Ergebnis ist [1]\n', out.getvalue())
+
+    def test_unbuffered(self):
+        out = io.StringIO()
+        setBufferCheckFailures(False)
+        try:
+            with contextlib.redirect_stdout(out):
+                check('a', 'b')
+        finally:
+            setBufferCheckFailures(True)
+        self.assertIn("Erwartet wird 'b', aber das Ergebnis ist 'a'\n", out.getvalue())
+
+    def test_uncoveredCase(self):
+        with self.assertRaises(Exception) as cm:
+            uncoveredCase()
+        self.assertTrue(str(cm.exception).startswith(f'{__file__}, Zeile '))
+
+    def test_largeValues(self):
+        @record
+        class Node:
+            value: int
+            children: list
+        def tree():
+            return [Node(i, [Node(j, []) for j in range(5)]) for i in range(100)]
+        expected = tree()
+        expected[17].children[3] = Node(42, [])
+        (e, a, detail) = w._formatCheckFailure(tree(), expected, (True, True))
+        self.assertLessEqual(len(e), w._MAX_REPORTED_VALUE_LEN + 3)
+        self.assertEqual(repr(tree())[:200], a[:200])
+        self.assertTrue(a.endswith('...'))
+        self.assertEqual('\n    Erster Unterschied bei [17].children[3].value: erwartet wird 42, '
+                         'aber das Ergebnis ist 3', detail)
+
+    def test_smallValues(self):
+        self.assertEqual(("'a'", "[1, (2,), {3: 'b'}, {4}]", ''),
+                         w._formatCheckFailure([1, (2,), {3: 'b'}, {4}], 'a', (True, True)))
@@ -375,6 +375,8 @@ export function activate(context: vscode.ExtensionContext) {
 
     // Run
     const runProg = context.asAbsolutePath('python/src/runYourProgram.py');
+    // Built by mkdist, only present in the packaged extension
+    const bundle = context.asAbsolutePath('python/wypp-bundle.zip');
     installCmd(
         context,
         "run",
@@ -396,13 +398,14 @@ export function activate(context: vscode.ExtensionContext) {
             const pyCmd = getPythonCmd(pyExt);
             const verboseOpt = beVerbose(context) ? " --verbose --no-clear" : "";
             const disableOpt = disableTypechecking(context) ? " --no-typechecking" : "";
+            const bundleOpt = fs.existsSync(bundle) ? " --bundle " + fileToCommandArgument(bundle) : "";
             if (pyCmd.kind !== "error") {
                 const pythonCmd = commandListToArgument(pyCmd.cmd);
                 const cmdTerm = await startTerminal(
                     terminals[cmdId]?.terminal,
                     "WYPP - RUN",
                     pythonCmd +  " " + fileToCommandArgument(runProg) + verboseOpt +
-                        disableOpt +
+                        disableOpt + bundleOpt +
                         " --install-mode install" +
                         " --interactive " +
                         " --change-directory " +